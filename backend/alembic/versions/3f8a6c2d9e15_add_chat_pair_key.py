@@ -0,0 +1,62 @@
+"""Add a unique participant pair key to two-person chats
+
+Revision ID: 3f8a6c2d9e15
+Revises: 7c5e9d3a1f64
+Create Date: 2026-10-17 19:08:41.527306
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3f8a6c2d9e15"
+down_revision: Union[str, None] = "7c5e9d3a1f64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column("chats", sa.Column("pair_low_id", sa.Uuid(), nullable=True))
+    op.add_column("chats", sa.Column("pair_high_id", sa.Uuid(), nullable=True))
+    # Key every chat with exactly two participants. Pairs that already have
+    # more than one chat, created by concurrent requests, keep the key on
+    # their oldest chat only; the others stay reachable from the chat list.
+    op.execute(
+        """
+        UPDATE chats SET pair_low_id = pairs.low, pair_high_id = pairs.high
+        FROM (
+            SELECT DISTINCT ON (low, high) chat_id, low, high
+            FROM (
+                SELECT chat_id,
+                       (array_agg(user_id ORDER BY user_id))[1] AS low,
+                       (array_agg(user_id ORDER BY user_id))[2] AS high
+                FROM chat_participants
+                GROUP BY chat_id
+                HAVING count(*) = 2
+            ) AS keyed
+            JOIN chats ON chats.id = keyed.chat_id
+            ORDER BY low, high, chats.seq
+        ) AS pairs
+        WHERE chats.id = pairs.chat_id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_chats_pair", "chats", ["pair_low_id", "pair_high_id"]
+    )
+    op.create_foreign_key(
+        "chats_pair_low_id_fkey", "chats", "users", ["pair_low_id"], ["id"]
+    )
+    op.create_foreign_key(
+        "chats_pair_high_id_fkey", "chats", "users", ["pair_high_id"], ["id"]
+    )
+
+
+def downgrade():
+    op.drop_constraint("chats_pair_high_id_fkey", "chats", type_="foreignkey")
+    op.drop_constraint("chats_pair_low_id_fkey", "chats", type_="foreignkey")
+    op.drop_constraint("uq_chats_pair", "chats", type_="unique")
+    op.drop_column("chats", "pair_high_id")
+    op.drop_column("chats", "pair_low_id")
@@ -0,0 +1,93 @@
+"""Server-side timestamps and message sequence
+
+Revision ID: 426edc447580
+Revises: b8856818ea7a
+Create Date: 2026-10-17 10:03:17.552019
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "426edc447580"
+down_revision: Union[str, None] = "b8856818ea7a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Existing timestamps were written as naive UTC
+    op.alter_column(
+        "messages",
+        "timestamp",
+        type_=sa.DateTime(timezone=True),
+        postgresql_using="timestamp AT TIME ZONE 'UTC'",
+        server_default=sa.func.now(),
+    )
+    op.alter_column(
+        "chats",
+        "created_at",
+        type_=sa.DateTime(timezone=True),
+        postgresql_using="created_at AT TIME ZONE 'UTC'",
+        server_default=sa.func.now(),
+    )
+
+    # Number existing messages in timestamp order, then continue the
+    # sequence from there for new inserts
+    op.execute(sa.schema.CreateSequence(sa.Sequence("messages_seq_seq")))
+    op.add_column("messages", sa.Column("seq", sa.BigInteger(), nullable=True))
+    op.execute(
+        """
+        UPDATE messages SET seq = numbered.seq
+        FROM (
+            SELECT id, row_number() OVER (ORDER BY timestamp, id) AS seq
+            FROM messages
+        ) AS numbered
+        WHERE messages.id = numbered.id
+        """
+    )
+    op.execute("SELECT setval('messages_seq_seq', (SELECT max(seq) FROM messages))")
+    op.execute("ALTER SEQUENCE messages_seq_seq OWNED BY messages.seq")
+    op.alter_column(
+        "messages",
+        "seq",
+        nullable=False,
+        server_default=sa.text("nextval('messages_seq_seq')"),
+    )
+
+    op.drop_index("ix_messages_chat_id_timestamp_id", "messages")
+    op.create_index(
+        "ix_messages_chat_id_timestamp_seq",
+        "messages",
+        ["chat_id", "timestamp", "seq"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_messages_chat_id_timestamp_seq", "messages")
+    op.create_index(
+        "ix_messages_chat_id_timestamp_id",
+        "messages",
+        ["chat_id", "timestamp", "id"],
+    )
+
+    # Dropping the column also drops the sequence it owns
+    op.drop_column("messages", "seq")
+
+    op.alter_column(
+        "chats",
+        "created_at",
+        type_=sa.DateTime(),
+        postgresql_using="created_at AT TIME ZONE 'UTC'",
+        server_default=None,
+    )
+    op.alter_column(
+        "messages",
+        "timestamp",
+        type_=sa.DateTime(),
+        postgresql_using="timestamp AT TIME ZONE 'UTC'",
+        server_default=None,
+    )
@@ -0,0 +1,53 @@
+"""Add chat read states
+
+Revision ID: 5d1f8e2a9c4b
+Revises: 426edc447580
+Create Date: 2026-10-17 14:05:42.731906
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5d1f8e2a9c4b"
+down_revision: Union[str, None] = "426edc447580"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        "chat_read_states",
+        sa.Column("user_id", sa.String(36), nullable=False),
+        sa.Column("chat_id", sa.String(36), nullable=False),
+        sa.Column("last_read_seq", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("unread_count", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["chat_id"], ["chats.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "chat_id"),
+    )
+    op.create_index("ix_chat_read_states_chat_id", "chat_read_states", ["chat_id"])
+
+    # Unread counts are computed from messages after a chat's read position
+    op.create_index("ix_messages_chat_id_seq", "messages", ["chat_id", "seq"])
+
+    # Start every participant with their chats read, rather than flagging
+    # the whole existing history as unread
+    op.execute(
+        """
+        INSERT INTO chat_read_states (user_id, chat_id, last_read_seq, unread_count)
+        SELECT cp.user_id, cp.chat_id, COALESCE(m.seq, 0), 0
+        FROM chat_participants cp
+        JOIN chats c ON c.id = cp.chat_id
+        LEFT JOIN messages m ON m.id = c.last_message_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_messages_chat_id_seq", "messages")
+    op.drop_index("ix_chat_read_states_chat_id", "chat_read_states")
+    op.drop_table("chat_read_states")
@@ -0,0 +1,176 @@
+"""Partition messages by month and add message archives
+
+Revision ID: 7c5e9d3a1f64
+Revises: e7b19d4c2a58
+Create Date: 2026-10-17 17:42:19.308514
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7c5e9d3a1f64"
+down_revision: Union[str, None] = "e7b19d4c2a58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months of partitions created ahead of the current one; `flask partitions
+# ensure` keeps extending them
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, chat_id, sender_id, text, timestamp, seq"
+
+# (name, columns, using)
+INDEXES = [
+    ("ix_messages_chat_id_timestamp_seq", "chat_id, timestamp, seq", "btree"),
+    ("ix_messages_chat_id_seq", "chat_id, seq", "btree"),
+    ("ix_messages_seq", "seq", "btree"),
+    ("ix_messages_sender_id", "sender_id", "btree"),
+    ("ix_messages_search_vector", "search_vector", "gin"),
+]
+
+
+def create_messages_table(partitioned: bool):
+    # A partitioned table's primary key must include the partition key, so
+    # ids are only unique together with their timestamp there
+    op.execute(
+        f"""
+        CREATE TABLE messages (
+            id uuid NOT NULL,
+            chat_id uuid NOT NULL REFERENCES chats (id),
+            sender_id uuid NOT NULL REFERENCES users (id),
+            text text NOT NULL,
+            timestamp timestamptz NOT NULL DEFAULT now(),
+            seq bigint NOT NULL DEFAULT nextval('messages_seq_seq'),
+            search_vector tsvector NOT NULL
+                GENERATED ALWAYS AS (to_tsvector('simple', text)) STORED,
+            CONSTRAINT messages_pkey PRIMARY KEY
+                ({"id, timestamp" if partitioned else "id"})
+        ) {"PARTITION BY RANGE (timestamp)" if partitioned else ""}
+        """
+    )
+
+
+def replace_messages_table(partitioned: bool):
+    # Free the names of the old table's indexes, then copy its rows over.
+    # Indexes are built after the copy, which is faster than maintaining
+    # them row by row.
+    op.execute("ALTER TABLE messages RENAME TO messages_old")
+    op.execute("ALTER INDEX messages_pkey RENAME TO messages_old_pkey")
+    for name, _, _ in INDEXES:
+        op.execute(f"DROP INDEX {name}")
+
+    create_messages_table(partitioned)
+    if partitioned:
+        op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+        op.execute(
+            f"""
+            DO $$
+            DECLARE
+                month timestamptz;
+            BEGIN
+                FOR month IN
+                    SELECT generate_series(
+                        date_trunc('month', COALESCE(
+                            (SELECT min(timestamp) FROM messages_old), now()
+                        ) AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                        date_trunc('month', now() AT TIME ZONE 'UTC')
+                            AT TIME ZONE 'UTC' + interval '{MONTHS_AHEAD} months',
+                        interval '1 month'
+                    )
+                LOOP
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF messages '
+                            || 'FOR VALUES FROM (%L) TO (%L)',
+                        to_char(month AT TIME ZONE 'UTC', '"messages_y"YYYY"m"MM'),
+                        month,
+                        month + interval '1 month'
+                    );
+                END LOOP;
+            END $$
+            """
+        )
+
+    op.execute(f"INSERT INTO messages ({COLUMNS}) SELECT {COLUMNS} FROM messages_old")
+    # The sequence is owned by the old seq column and would be dropped with it
+    op.execute("ALTER SEQUENCE messages_seq_seq OWNED BY messages.seq")
+    op.execute("DROP TABLE messages_old")
+
+    for name, columns, using in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON messages USING {using} ({columns})")
+    # Autovacuum never analyzes a partitioned table itself, and the planner
+    # needs statistics on the new table right away
+    op.execute("ANALYZE messages")
+
+
+def upgrade():
+    # Foreign keys to a partitioned table must cover the partition key, which
+    # last_message_id does not; the application keeps it pointing at the
+    # chat's latest message
+    op.drop_constraint("fk_last_message", "chats", type_="foreignkey")
+    # Lets joins to the last message prune the other partitions
+    op.add_column(
+        "chats", sa.Column("last_message_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.execute(
+        """
+        UPDATE chats SET last_message_at = messages.timestamp
+        FROM messages WHERE messages.id = chats.last_message_id
+        """
+    )
+    replace_messages_table(partitioned=True)
+
+    op.create_table(
+        "message_archives",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("partition_name", sa.String(100), nullable=False, unique=True),
+        sa.Column("range_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("range_end", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("path", sa.String(255), nullable=False),
+        sa.Column("message_count", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "archived_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+    op.create_table(
+        "message_archive_chats",
+        sa.Column(
+            "archive_id",
+            sa.Integer(),
+            sa.ForeignKey("message_archives.id"),
+            primary_key=True,
+        ),
+        sa.Column("chat_id", sa.Uuid(), primary_key=True),
+        sa.Column("byte_offset", sa.BigInteger(), nullable=False),
+        sa.Column("byte_length", sa.BigInteger(), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "ix_message_archive_chats_chat_id", "message_archive_chats", ["chat_id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_message_archive_chats_chat_id", "message_archive_chats")
+    op.drop_table("message_archive_chats")
+    op.drop_table("message_archives")
+
+    # Archived messages stay in their files and are not restored
+    replace_messages_table(partitioned=False)
+    op.execute(
+        """
+        UPDATE chats SET last_message_id = NULL
+        WHERE last_message_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM messages WHERE id = chats.last_message_id)
+        """
+    )
+    op.create_foreign_key(
+        "fk_last_message", "chats", "messages", ["last_message_id"], ["id"]
+    )
+    op.drop_column("chats", "last_message_at")
@@ -0,0 +1,55 @@
+"""Backfill each chat's last message
+
+Revision ID: 8b2d4f6a1c73
+Revises: 3f8a6c2d9e15
+Create Date: 2026-10-17 20:14:52.680193
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2d4f6a1c73"
+down_revision: Union[str, None] = "3f8a6c2d9e15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Messages created before create_message kept last_message_id up to date
+    # left it NULL, so point every chat at its latest message
+    op.execute(
+        """
+        UPDATE chats
+        SET last_message_id = latest.id, last_message_at = latest.timestamp
+        FROM (
+            SELECT DISTINCT ON (chat_id) chat_id, id, timestamp
+            FROM messages
+            ORDER BY chat_id, timestamp DESC, seq DESC
+        ) AS latest
+        WHERE chats.id = latest.chat_id
+          AND chats.last_message_id IS DISTINCT FROM latest.id
+        """
+    )
+    # The read states migration started everyone as having read their chats
+    # up to the last message, which was missing for those chats
+    op.execute(
+        """
+        UPDATE chat_read_states
+        SET last_read_seq = messages.seq
+        FROM chats
+        JOIN messages
+          ON messages.id = chats.last_message_id
+         AND messages.timestamp = chats.last_message_at
+        WHERE chats.id = chat_read_states.chat_id
+          AND chat_read_states.last_read_seq = 0
+          AND chat_read_states.unread_count = 0
+        """
+    )
+
+
+def downgrade():
+    # The backfilled values are correct for the earlier schema too
+    pass
@@ -0,0 +1,54 @@
+"""Add chat sequence and message seq index for sync
+
+Revision ID: 9a3c7e1b5d20
+Revises: 5d1f8e2a9c4b
+Create Date: 2026-10-17 15:21:08.164233
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9a3c7e1b5d20"
+down_revision: Union[str, None] = "5d1f8e2a9c4b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Number existing chats in creation order, then continue the sequence
+    # from there for new chats
+    op.execute(sa.schema.CreateSequence(sa.Sequence("chats_seq_seq")))
+    op.add_column("chats", sa.Column("seq", sa.BigInteger(), nullable=True))
+    op.execute(
+        """
+        UPDATE chats SET seq = numbered.seq
+        FROM (
+            SELECT id, row_number() OVER (ORDER BY created_at, id) AS seq
+            FROM chats
+        ) AS numbered
+        WHERE chats.id = numbered.id
+        """
+    )
+    op.execute("SELECT setval('chats_seq_seq', (SELECT max(seq) FROM chats))")
+    op.execute("ALTER SEQUENCE chats_seq_seq OWNED BY chats.seq")
+    op.alter_column(
+        "chats",
+        "seq",
+        nullable=False,
+        server_default=sa.text("nextval('chats_seq_seq')"),
+    )
+    op.create_index("ix_chats_seq", "chats", ["seq"])
+
+    # Sync reads messages after a seq across all of a user's chats
+    op.create_index("ix_messages_seq", "messages", ["seq"])
+
+
+def downgrade():
+    op.drop_index("ix_messages_seq", "messages")
+    op.drop_index("ix_chats_seq", "chats")
+    # Dropping the column also drops the sequence it owns
+    op.drop_column("chats", "seq")
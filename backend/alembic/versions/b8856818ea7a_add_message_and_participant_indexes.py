@@ -0,0 +1,40 @@
+"""Add message and participant indexes
+
+Revision ID: b8856818ea7a
+Revises: b37c2d5f54f4
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b8856818ea7a"
+down_revision: Union[str, None] = "b37c2d5f54f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Chat history is read per chat in (timestamp, id) order
+    op.create_index(
+        "ix_messages_chat_id_timestamp_id",
+        "messages",
+        ["chat_id", "timestamp", "id"],
+    )
+    op.create_index("ix_messages_sender_id", "messages", ["sender_id"])
+
+    # The primary key leads with chat_id, so add the reverse for user lookups
+    op.create_index(
+        "ix_chat_participants_user_id_chat_id",
+        "chat_participants",
+        ["user_id", "chat_id"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_chat_participants_user_id_chat_id", "chat_participants")
+    op.drop_index("ix_messages_sender_id", "messages")
+    op.drop_index("ix_messages_chat_id_timestamp_id", "messages")
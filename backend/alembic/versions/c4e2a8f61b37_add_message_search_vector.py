@@ -0,0 +1,45 @@
+"""Add message full-text search vector
+
+Revision ID: c4e2a8f61b37
+Revises: 9a3c7e1b5d20
+Create Date: 2026-10-17 16:02:55.904117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e2a8f61b37"
+down_revision: Union[str, None] = "9a3c7e1b5d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # The 'simple' configuration lowercases words without stemming or stop
+    # words, so messages in any language are searchable. Adding the generated
+    # column rewrites the table once to compute it for existing messages.
+    op.add_column(
+        "messages",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', text)", persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_messages_search_vector",
+        "messages",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade():
+    op.drop_index("ix_messages_search_vector", "messages")
+    op.drop_column("messages", "search_vector")
@@ -0,0 +1,65 @@
+"""Native UUID primary and foreign keys
+
+Revision ID: e7b19d4c2a58
+Revises: c4e2a8f61b37
+Create Date: 2026-10-17 16:48:31.577210
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b19d4c2a58"
+down_revision: Union[str, None] = "c4e2a8f61b37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Id columns per table
+ID_COLUMNS = {
+    "users": ["id"],
+    "chats": ["id", "last_message_id"],
+    "messages": ["id", "chat_id", "sender_id"],
+    "chat_participants": ["chat_id", "user_id"],
+    "chat_read_states": ["user_id", "chat_id"],
+}
+
+# (name, table, column, referenced table)
+FOREIGN_KEYS = [
+    ("fk_last_message", "chats", "last_message_id", "messages"),
+    ("messages_chat_id_fkey", "messages", "chat_id", "chats"),
+    ("messages_sender_id_fkey", "messages", "sender_id", "users"),
+    ("chat_participants_chat_id_fkey", "chat_participants", "chat_id", "chats"),
+    ("chat_participants_user_id_fkey", "chat_participants", "user_id", "users"),
+    ("chat_read_states_chat_id_fkey", "chat_read_states", "chat_id", "chats"),
+    ("chat_read_states_user_id_fkey", "chat_read_states", "user_id", "users"),
+]
+
+
+def convert_ids(type_: str, using: str):
+    # Foreign keys cannot span the type change, so drop them first
+    for name, table, _, _ in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_="foreignkey")
+
+    # One ALTER TABLE per table, so each table and its indexes are rewritten
+    # once rather than once per column
+    for table, columns in ID_COLUMNS.items():
+        op.execute(
+            f"ALTER TABLE {table} "
+            + ", ".join(
+                f"ALTER COLUMN {column} TYPE {type_} USING {column}::{using}"
+                for column in columns
+            )
+        )
+
+    for name, table, column, referenced in FOREIGN_KEYS:
+        op.create_foreign_key(name, table, referenced, [column], ["id"])
+
+
+def upgrade():
+    convert_ids("uuid", "uuid")
+
+
+def downgrade():
+    convert_ids("varchar(36)", "text")
@@ -0,0 +1,135 @@
+"""
+Measure Socket.IO room broadcast throughput across backend worker processes.
+
+Each worker process runs its own SocketIO server attached to the shared
+message queue, with an equal share of the clients joined to a single room.
+The parent process publishes events to that room through a write-only
+emitter, as another backend process would, and reports the combined rate at
+which the workers deliver them to their clients.
+
+Clients are registered directly with each server's manager and their
+transport is replaced by a counter (the Flask-SocketIO test client refuses
+to run with a message queue), so the numbers cover queue consumption,
+packet encoding and per-client dispatch, but not socket writes.
+
+Usage (from the backend directory, with Redis running):
+
+    python benchmarks/broadcast_fanout.py --queue redis://localhost:6379/0 \\
+        --workers 1 2 4 --clients 2000 --events 200
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOM = "benchmark"
+
+
+def run_worker(queue_url, clients, events, ready, results):
+    import uuid
+
+    from flask import Flask
+    from flask_socketio import SocketIO
+
+    from pubsub import message_queue_options
+
+    app = Flask(__name__)
+    socketio = SocketIO(app, **message_queue_options(queue_url))
+    server = socketio.server
+
+    received = {"warmup": 0, "bench": 0}
+
+    def send_eio_packet(eio_sid, packet):
+        # Event packets are encoded as 2["<name>", ...]
+        name = "bench" if '"bench"' in packet.data[:16] else "warmup"
+        received[name] += 1
+
+    server._send_eio_packet = send_eio_packet
+    server.manager_initialized = True
+    server.manager.initialize()
+    for _ in range(clients):
+        sid = server.manager.connect(uuid.uuid4().hex, "/")
+        server.manager.enter_room(sid, "/", ROOM)
+
+    # Wait until the queue subscription is live before reporting ready
+    while not received["warmup"]:
+        time.sleep(0.01)
+    ready.set()
+
+    expected = clients * events
+    while received["bench"] < expected:
+        time.sleep(0.001)
+    results.put(time.perf_counter())
+
+
+def run(queue_url, workers, clients, events):
+    from flask_socketio import SocketIO
+
+    emitter = SocketIO(message_queue=queue_url)
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    readies = [ctx.Event() for _ in range(workers)]
+    processes = [
+        ctx.Process(
+            target=run_worker,
+            args=(queue_url, clients // workers, events, ready, results),
+        )
+        for ready in readies
+    ]
+    for process in processes:
+        process.start()
+
+    while not all(ready.is_set() for ready in readies):
+        emitter.emit("warmup", {}, to=ROOM)
+        time.sleep(0.1)
+
+    payload = {"chatId": ROOM, "sender": "benchmark", "text": "x" * 64}
+    started = time.perf_counter()
+    for i in range(events):
+        emitter.emit("bench", dict(payload, seq=i), to=ROOM)
+    finished = max(results.get() for _ in processes)
+
+    for process in processes:
+        process.join()
+
+    elapsed = finished - started
+    deliveries = (clients // workers) * workers * events
+    return {
+        "workers": workers,
+        "clients": (clients // workers) * workers,
+        "events": events,
+        "seconds": round(elapsed, 4),
+        "deliveries_per_sec": round(deliveries / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--queue", default="redis://localhost:6379/0")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        result = run(args.queue, workers, args.clients, args.events)
+        print(
+            f"{result['workers']} worker(s): {result['deliveries_per_sec']:>10} "
+            f"deliveries/sec ({result['clients']} clients, {result['events']} events)"
+        )
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
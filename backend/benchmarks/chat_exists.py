@@ -0,0 +1,111 @@
+"""
+Compare ways of checking whether two users already have a chat.
+
+Times, on a seeded database:
+
+- participants_exists: the previous check, two correlated EXISTS subqueries
+  over chat_participants
+- pair_key: check_chat_exists, one lookup in the unique index on chats
+
+Half of the checked pairs have a chat and half do not. The check only reads,
+so the database is left unchanged. Seed it with enough users for millions of
+participant rows, for example:
+
+    python seed_db.py --synthetic --users 300000 --chats-per-user 5 \\
+        --messages-per-chat 1
+
+Usage (from the backend directory):
+
+    python benchmarks/chat_exists.py --lookups 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run(args):
+    from sqlalchemy import func
+
+    import queries
+    from app import app, db
+    from models import Chat, User, chat_participants
+
+    def participants_exists(user1_id, user2_id):
+        return Chat.query.filter(
+            Chat.participants.any(id=user1_id), Chat.participants.any(id=user2_id)
+        ).first()
+
+    checks = {
+        "participants_exists": participants_exists,
+        "pair_key": queries.check_chat_exists,
+    }
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        participant_rows = (
+            db.session.query(func.count()).select_from(chat_participants).scalar()
+        )
+        existing = [
+            tuple(pair)
+            for pair in db.session.query(Chat.pair_low_id, Chat.pair_high_id)
+            .filter(Chat.pair_low_id.isnot(None))
+            .order_by(func.random())
+            .limit(args.lookups // 2)
+        ]
+        user_ids = [
+            user_id
+            for (user_id,) in db.session.query(User.id)
+            .order_by(func.random())
+            .limit(args.lookups)
+        ]
+        pairs = existing + [
+            tuple(rng.sample(user_ids, 2)) for _ in range(args.lookups - len(existing))
+        ]
+        rng.shuffle(pairs)
+        db.session.rollback()
+
+        print(
+            f"{participant_rows} participant rows, {len(pairs)} lookups "
+            f"({len(existing)} existing chats)"
+        )
+        print(f"{'check':<20} {'p50 ms':>9} {'p99 ms':>9} {'found':>7}")
+        for name, check in checks.items():
+            for pair in pairs[: args.warmup]:
+                check(*pair)
+            timings, found = [], 0
+            for pair in pairs:
+                started = time.perf_counter()
+                found += check(*pair) is not None
+                timings.append((time.perf_counter() - started) * 1000)
+                db.session.rollback()
+            timings.sort()
+            print(
+                f"{name:<20} {statistics.median(timings):>9.3f} "
+                f"{timings[int(len(timings) * 0.99)]:>9.3f} {found:>7}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--database-url",
+        help="Database to benchmark against (defaults to DATABASE_URL)",
+    )
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
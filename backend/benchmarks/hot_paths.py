@@ -0,0 +1,256 @@
+"""
+Benchmark the REST and Socket.IO hot paths against a seeded database.
+
+Drives the app in-process through Flask's test client and the Socket.IO
+test client, and reports ops/sec, p50/p99 latency and SQL statements per
+operation for each scenario. Results can be saved as JSON and compared with
+an earlier run to spot regressions between commits.
+
+Usage (from the backend directory, after `python seed_db.py --synthetic`):
+
+    python benchmarks/hot_paths.py --output before.json
+    python benchmarks/hot_paths.py --compare before.json
+
+Scenarios that send messages write to the database, so point
+--database-url at a disposable copy.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def measure(name, operation, iterations, warmup, counter):
+    for _ in range(warmup):
+        operation()
+
+    latencies = []
+    queries_before = counter.count
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_started = time.perf_counter()
+        operation()
+        latencies.append((time.perf_counter() - op_started) * 1000)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(iterations - 1, int(iterations * 0.99))], 3),
+        "queries_per_op": round((counter.count - queries_before) / iterations, 2),
+    }
+    print(
+        f"{name:<16} {result['ops_per_sec']:>10} ops/s  "
+        f"p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+        f"{result['queries_per_op']:>6} queries/op"
+    )
+    return result
+
+
+def expect(response, status):
+    if response.status_code != status:
+        raise RuntimeError(
+            f"{response.request.method} {response.request.path} returned "
+            f"{response.status_code}: {response.get_data(as_text=True)[:200]}"
+        )
+    return response
+
+
+def pick_user(db):
+    """The username in the most chats, and that user's busiest chat."""
+    from sqlalchemy import func
+
+    from models import Message, User, chat_participants
+
+    username, user_id = (
+        db.session.query(User.username, User.id)
+        .join(chat_participants, chat_participants.c.user_id == User.id)
+        .group_by(User.id)
+        .order_by(func.count().desc())
+        .first()
+    )
+    chat_id = (
+        db.session.query(Message.chat_id)
+        .join(chat_participants, chat_participants.c.chat_id == Message.chat_id)
+        .filter(chat_participants.c.user_id == user_id)
+        .group_by(Message.chat_id)
+        .order_by(func.count().desc())
+        .first()
+    ).chat_id
+    return username, chat_id
+
+
+def run(args):
+    from sqlalchemy import event
+
+    from app import app, socketio
+    from db import db
+
+    with app.app_context():
+        engine = db.engine
+        username, chat_id = pick_user(db)
+        database = engine.dialect.name
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+
+    client = app.test_client()
+    credentials = {"username": username, "password": args.password}
+    token = expect(client.post("/api/login", json=credentials), 200).json["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    room = [
+        socketio.test_client(app, query_string=f"token={token}")
+        for _ in range(args.room_size)
+    ]
+    for member in room:
+        member.emit("join_chat", {"chatId": chat_id, "participants": []})
+        member.get_received()
+    sender = room[0]
+
+    def broadcast():
+        ack = sender.emit(
+            "send_message", {"chat_id": chat_id, "text": "benchmark"}, callback=True
+        )
+        if "error" in ack:
+            raise RuntimeError(f"send_message failed: {ack['error']}")
+        for member in room:
+            member.get_received()
+
+    scenarios = {
+        "chats": lambda: expect(client.get("/api/chats", headers=headers), 200),
+        "chat_history": lambda: expect(
+            client.get(f"/api/chats/{chat_id}", headers=headers), 200
+        ),
+        "send_message": lambda: expect(
+            client.post(
+                "/api/messages",
+                json={"chat_id": chat_id, "text": "benchmark"},
+                headers=headers,
+            ),
+            201,
+        ),
+        "search": lambda: expect(
+            client.get(
+                "/api/search", query_string={"q": args.search_query}, headers=headers
+            ),
+            200,
+        ),
+        "login": lambda: expect(client.post("/api/login", json=credentials), 200),
+        "broadcast": broadcast,
+    }
+    iterations = {"login": args.login_iterations}
+
+    print(f"Benchmarking as {username} on {database}, chat {chat_id}")
+    results = {}
+    for name, operation in scenarios.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(
+            name,
+            operation,
+            iterations.get(name, args.iterations),
+            args.warmup,
+            counter,
+        )
+
+    for member in room:
+        member.disconnect()
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(tz=timezone.utc).isoformat(),
+        "database": database,
+        "room_size": args.room_size,
+        "results": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    print(f"\nChange vs {baseline.get('commit') or 'baseline'}:")
+    for name, result in report["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        ops = (result["ops_per_sec"] / before["ops_per_sec"] - 1) * 100
+        p99 = (result["p99_ms"] / before["p99_ms"] - 1) * 100
+        queries = result["queries_per_op"] - before["queries_per_op"]
+        print(
+            f"{name:<16} ops/s {ops:+7.1f}%  p99 {p99:+7.1f}%  "
+            f"queries/op {queries:+.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--database-url",
+        help="Database to benchmark against (defaults to DATABASE_URL)",
+    )
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--login-iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--search-query",
+        default="contract review",
+        help="Search text for the search scenario",
+    )
+    parser.add_argument(
+        "--room-size", type=int, default=50, help="Socket clients in the chat room"
+    )
+    parser.add_argument("--only", nargs="+", help="Scenarios to run")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare with a previous results file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    # The Socket.IO test client only works with in-process rooms
+    os.environ.pop("SOCKETIO_MESSAGE_QUEUE", None)
+    # The login scenario repeats the same username from one address
+    os.environ.setdefault("LOGIN_RATE_LIMIT_PER_USERNAME", "1000000")
+    os.environ.setdefault("LOGIN_RATE_LIMIT_PER_IP", "1000000")
+
+    report = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Load test: hold many idle Socket.IO connections and measure send latency.
+
+Opens --connections WebSocket connections to a running backend, keeps them
+idle (answering heartbeats only), then sends --samples messages over one
+more connection and reports the ack round-trip percentiles.
+
+Usage (from the backend directory, against `python serve.py`):
+
+    python benchmarks/idle_sockets.py --url http://127.0.0.1:5000 \\
+        --connections 10000 --samples 500
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import time  # noqa: E402
+import urllib.request  # noqa: E402
+
+import gevent  # noqa: E402
+from gevent.lock import BoundedSemaphore  # noqa: E402
+from simple_websocket import Client, ConnectionClosed  # noqa: E402
+
+
+def http_json(url, data=None, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    body = json.dumps(data).encode() if data is not None else None
+    with urllib.request.urlopen(
+        urllib.request.Request(url, data=body, headers=headers)
+    ) as response:
+        return json.loads(response.read())
+
+
+def open_socket(ws_url):
+    """Open an Engine.IO WebSocket and connect to the default namespace."""
+    ws = Client.connect(ws_url)
+    ws.receive()  # Engine.IO open packet
+    ws.send("40")
+    while not ws.receive().startswith("40"):
+        pass
+    return ws
+
+
+def idle(ws_url, connecting, connected, failed):
+    try:
+        with connecting:
+            ws = open_socket(ws_url)
+    except Exception:
+        failed.append(ws_url)
+        return
+    connected.append(ws)
+    try:
+        while True:
+            if ws.receive() == "2":
+                ws.send("3")
+    except ConnectionClosed:
+        pass
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--username", default="anton")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    token = http_json(
+        f"{args.url}/api/login",
+        {"username": args.username, "password": args.password},
+    )["token"]
+    chat_id = http_json(f"{args.url}/api/chats", token=token)[0]["chatId"]
+    ws_url = (
+        args.url.replace("http", "ws", 1)
+        + f"/socket.io/?EIO=4&transport=websocket&token={token}"
+    )
+
+    connecting = BoundedSemaphore(args.concurrency)
+    connected, failed = [], []
+    started = time.perf_counter()
+    for _ in range(args.connections):
+        gevent.spawn(idle, ws_url, connecting, connected, failed)
+    while len(connected) + len(failed) < args.connections:
+        gevent.sleep(0.1)
+    print(
+        f"idle connections: {len(connected)}/{args.connections} "
+        f"({len(failed)} failed) in {time.perf_counter() - started:.1f}s"
+    )
+
+    probe = open_socket(ws_url)
+    latencies = []
+    for ack_id in range(args.samples):
+        payload = ["send_message", {"chat_id": chat_id, "text": "latency probe"}]
+        sent = time.perf_counter()
+        probe.send(f"42{ack_id}{json.dumps(payload)}")
+        while True:
+            packet = probe.receive()
+            if packet == "2":
+                probe.send("3")
+            elif packet.startswith(f"43{ack_id}["):
+                break
+        latencies.append((time.perf_counter() - sent) * 1000)
+
+    print(
+        f"send_message ack latency over {args.samples} samples: "
+        f"p50 {percentile(latencies, 50):.1f} ms, "
+        f"p99 {percentile(latencies, 99):.1f} ms"
+    )
+
+    for ws in [probe, *connected]:
+        try:
+            ws.close()
+        except ConnectionClosed:
+            pass
+
+
+if __name__ == "__main__":
+    main()
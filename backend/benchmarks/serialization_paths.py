@@ -0,0 +1,128 @@
+"""
+Compare response serialization paths on a chat history payload.
+
+Builds synthetic message rows and serializes a ChatMessagesResponse-shaped
+payload through:
+
+- pydantic: MessageResponse models per row, model_dump and jsonify, as the
+  endpoints did before the fast path
+- type_adapter: plain dicts validated by a cached TypeAdapter and jsonified,
+  the path used by endpoints not in FAST_SERIALIZATION_ENDPOINTS
+- fast_stdlib / fast_orjson: plain dicts encoded directly by serialization.py
+
+No database is needed.
+
+Usage (from the backend directory):
+
+    python benchmarks/serialization_paths.py --messages 10000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MessageRow = namedtuple("MessageRow", "id chat_id sender text timestamp seq")
+
+
+def make_rows(count):
+    chat_id = str(uuid.uuid4())
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        MessageRow(
+            id=str(uuid.uuid4()),
+            chat_id=chat_id,
+            sender=f"user{i % 2}",
+            text=f"Message number {i} about the contract review",
+            timestamp=started + timedelta(seconds=i, microseconds=i),
+            seq=i,
+        )
+        for i in range(count)
+    ]
+
+
+def run(args):
+    import serialization
+    from app import ChatMessagesResponse, MessageResponse, app, type_adapter
+    from flask import jsonify
+
+    rows = make_rows(args.messages)
+    chat_id = rows[0].chat_id
+
+    def pydantic_path():
+        response = ChatMessagesResponse(
+            chatId=chat_id,
+            nextCursor=None,
+            messages=[
+                MessageResponse(
+                    messageId=msg.id,
+                    chatId=msg.chat_id,
+                    sender=msg.sender,
+                    text=msg.text,
+                    timestamp=msg.timestamp,
+                )
+                for msg in rows
+            ],
+        )
+        return jsonify(response.model_dump()).get_data()
+
+    def payload():
+        return {
+            "chatId": chat_id,
+            "nextCursor": None,
+            "messages": [serialization.message_dict(msg) for msg in rows],
+        }
+
+    def type_adapter_path():
+        adapter = type_adapter(ChatMessagesResponse)
+        response = adapter.dump_python(adapter.validate_python(payload()))
+        return jsonify(response).get_data()
+
+    def fast_path():
+        return serialization.json_response(payload()).get_data()
+
+    paths = {"pydantic": pydantic_path, "type_adapter": type_adapter_path}
+    orjson = serialization.orjson
+    if orjson is not None:
+        paths["fast_orjson"] = fast_path
+
+    def fast_stdlib_path():
+        serialization.orjson = None
+        try:
+            return fast_path()
+        finally:
+            serialization.orjson = orjson
+
+    paths["fast_stdlib"] = fast_stdlib_path
+
+    print(f"{args.messages} messages, median of {args.repeat} runs")
+    print(f"{'path':<14} {'ms':>9} {'KB':>9}")
+    with app.test_request_context():
+        for name, path in paths.items():
+            path()
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                body = path()
+                timings.append((time.perf_counter() - started) * 1000)
+            print(
+                f"{name:<14} {statistics.median(timings):>9.1f} "
+                f"{len(body) / 1024:>9.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
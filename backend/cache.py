@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with a maximum size and entry lifetime.
+
+    Entries expire `ttl` seconds after they are stored, and the least recently
+    used entry is evicted once more than `maxsize` are held. Lookups that load
+    None are not stored, so missing rows are read again next time. The cache
+    is per process: invalidation only reaches the process that calls it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._generation = 0
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for the key, or call `load` and cache its
+        result.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        value = load()
+        if value is None:
+            return value
+
+        with self._lock:
+            # Skip storing a value loaded before an invalidation, it may be stale
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one entry, or every entry if no key is given."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def cache_metrics(caches: Dict[str, TTLCache]) -> List[str]:
+    """Hit, miss and eviction counters and sizes in the Prometheus text format."""
+    lines = []
+    for name, kind, value in (
+        ("legora_cache_hits_total", "counter", lambda cache: cache.hits),
+        ("legora_cache_misses_total", "counter", lambda cache: cache.misses),
+        ("legora_cache_evictions_total", "counter", lambda cache: cache.evictions),
+        ("legora_cache_entries", "gauge", len),
+    ):
+        lines.append(f"# TYPE {name} {kind}")
+        for label, cache in sorted(caches.items()):
+            lines.append(f'{name}{{cache="{label}"}} {value(cache)}')
+    return lines
@@ -1,3 +1,159 @@
+import random
+import threading
+import time
+from functools import wraps
+from typing import Dict, List, Optional
+
+import redis
+from flask import Flask, current_app
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+
+
+class ReplicaRouter:
+    """
+    Chooses the engine for reads made inside read_only query functions.
+
+    Replicas are the SQLALCHEMY_BINDS named replica_<n>. A user who has just
+    written is pinned to the primary for DATABASE_REPLICA_STICKY_SECONDS, so
+    they read their own writes while the replicas catch up. Pins are kept in
+    Redis when DATABASE_REPLICA_STICKY_URL is set, so they hold whichever
+    process serves the user's next request, and in process memory otherwise.
+    """
+
+    key_prefix = "legora:replica_sticky:"
+
+    def __init__(self):
+        self.replica_keys: List[str] = []
+        self.sticky_seconds = 0.0
+        self.redis = None
+        self._lock = threading.Lock()
+        self._sticky_until: Dict[str, float] = {}
+
+    def init_app(self, app: Flask):
+        app.config.setdefault("DATABASE_REPLICA_STICKY_SECONDS", 5)
+        app.config.setdefault("DATABASE_REPLICA_STICKY_URL", None)
+        self.sticky_seconds = app.config["DATABASE_REPLICA_STICKY_SECONDS"]
+        self.replica_keys = sorted(
+            key
+            for key in app.config.get("SQLALCHEMY_BINDS") or {}
+            if key.startswith("replica_")
+        )
+        url = app.config["DATABASE_REPLICA_STICKY_URL"]
+        self.redis = redis.Redis.from_url(url) if url and self.replica_keys else None
+
+    def stick(self, key: str):
+        """Pin a user to the primary after a write."""
+        if self.redis is not None:
+            try:
+                self.redis.set(
+                    self.key_prefix + key, 1, px=int(self.sticky_seconds * 1000)
+                )
+            except redis.RedisError:
+                current_app.logger.warning("Could not pin user %s to the primary", key)
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._sticky_until[key] = now + self.sticky_seconds
+            if len(self._sticky_until) > 100_000:
+                self._sticky_until = {
+                    k: until for k, until in self._sticky_until.items() if until > now
+                }
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        if self.redis is not None:
+            try:
+                return bool(self.redis.exists(self.key_prefix + key))
+            except redis.RedisError:
+                # The primary is always up to date
+                return True
+        return self._sticky_until.get(key, 0) > time.monotonic()
+
+    def choose(self) -> Optional[str]:
+        """The bind key of a replica to read from, or None for the primary."""
+        return random.choice(self.replica_keys) if self.replica_keys else None
+
+
+router = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads inside read_only query functions to a replica.
+
+    Flushes, INSERT/UPDATE/DELETE statements and reads outside read_only go
+    to the primary, as do reads by a user pinned there after a write. The
+    replica, or the primary for a pinned user, is chosen once per session, so
+    a request sees a single snapshot and checks the pin at most once.
+    The acting user is taken from info["user_id"], set by the app.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            writing = self._flushing or getattr(clause, "is_dml", False)
+            if writing:
+                self.info["wrote"] = True
+            elif self.info.get("read_only"):
+                if "replica" not in self.info:
+                    sticky = router.is_sticky(self.info.get("user_id"))
+                    self.info["replica"] = None if sticky else router.choose()
+                key = self.info["replica"]
+                if key is not None:
+                    return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def commit(self):
+        super().commit()
+        if self.info.pop("wrote", False) and self.info.get("user_id"):
+            router.stick(self.info["user_id"])
+            # Read the rest of this session from the primary too
+            self.info["replica"] = None
+
+
+def read_only(query_function):
+    """
+    Decorator for query functions that only read, allowing their statements
+    to be served by a replica.
+    """
+
+    @wraps(query_function)
+    def wrapper(*args, **kwargs):
+        previous = db.session.info.get("read_only", False)
+        db.session.info["read_only"] = True
+        try:
+            return query_function(*args, **kwargs)
+        finally:
+            db.session.info["read_only"] = previous
+
+    return wrapper
+
+
+def engine_options(
+    database_url: str,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_pre_ping: bool = False,
+    pool_recycle: Optional[int] = None,
+    statement_timeout_ms: Optional[int] = None,
+) -> dict:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the given pool settings, shared by the
+    primary and the replicas. Unset values keep SQLAlchemy's defaults.
+    """
+    options = {"pool_pre_ping": pool_pre_ping}
+    if pool_size is not None:
+        options["pool_size"] = pool_size
+    if max_overflow is not None:
+        options["max_overflow"] = max_overflow
+    if pool_recycle is not None:
+        options["pool_recycle"] = pool_recycle
+    if statement_timeout_ms and database_url.startswith("postgresql"):
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={statement_timeout_ms}"
+        }
+    return options
+
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
@@ -0,0 +1,219 @@
+import hmac
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Flask, Response, current_app, g, has_app_context, request
+from pydantic import BaseModel
+from sqlalchemy import event
+
+from db import db
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RequestStats(BaseModel):
+    started: float
+    statements: int = 0
+    db_seconds: float = 0.0
+    status: Optional[int] = None
+
+
+class EndpointStats(BaseModel):
+    requests: int = 0
+    errors: int = 0
+    client_errors: int = 0
+    statements: int = 0
+    db_seconds: float = 0.0
+    latency_seconds: float = 0.0
+    latency_buckets: List[int] = [0] * len(LATENCY_BUCKETS)
+
+
+class Instrumentation:
+    """
+    Opt-in per-endpoint metrics for HTTP requests and Socket.IO events.
+
+    Counts SQL statements and database time through SQLAlchemy cursor events
+    and measures total latency, keeping running totals per endpoint. HTTP
+    requests answered with a 5xx status or raising, and Socket.IO events
+    acked with an error, count as errors; HTTP 4xx answers count as client
+    errors. The totals are served in the Prometheus text format at /metrics,
+    which requires INSTRUMENTATION_METRICS_TOKEN as a bearer token when set,
+    and requests slower than INSTRUMENTATION_SLOW_REQUEST_MS are logged as
+    warnings. Metrics are kept per process.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._endpoints: Dict[Tuple[str, str], EndpointStats] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.config.setdefault("INSTRUMENTATION_ENABLED", False)
+        app.config.setdefault("INSTRUMENTATION_SLOW_REQUEST_MS", 500)
+        app.config.setdefault("INSTRUMENTATION_METRICS_TOKEN", None)
+        if not app.config["INSTRUMENTATION_ENABLED"]:
+            return
+
+        self.enabled = True
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+        app.add_url_rule("/metrics", "metrics", self.metrics)
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, "before_cursor_execute", self._before_execute)
+                event.listen(engine, "after_cursor_execute", self._after_execute)
+                event.listen(engine, "handle_error", self._statement_failed)
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """
+        Register a function returning extra Prometheus text lines for /metrics.
+        """
+        self._collectors.append(collector)
+
+    def socket_event(self, handler):
+        """
+        Decorator recording a Socket.IO event handler like an HTTP request.
+        """
+
+        @wraps(handler)
+        def wrapper(*args):
+            if not self.enabled:
+                return handler(*args)
+
+            self._start_request()
+            failed = True
+            try:
+                result = handler(*args)
+                # Handlers catch their exceptions and ack with an error instead
+                failed = isinstance(result, dict) and "error" in result
+                return result
+            finally:
+                self._record("socketio", request.event["message"], failed)
+
+        return wrapper
+
+    def _start_request(self):
+        g.request_stats = RequestStats(started=time.perf_counter())
+
+    def _record_status(self, response: Response) -> Response:
+        if "request_stats" in g:
+            g.request_stats.status = response.status_code
+        return response
+
+    def _finish_request(self, error=None):
+        # Socket.IO events also tear down a request context, but are recorded
+        # by socket_event instead
+        if "request_stats" in g and request.endpoint:
+            status = g.request_stats.status or 500
+            self._record(
+                "http",
+                request.endpoint,
+                failed=error is not None or status >= 500,
+                client_error=400 <= status < 500,
+            )
+
+    # The start time is kept on the statement's execution context, as
+    # after_cursor_execute does not fire for statements that raise
+    def _before_execute(self, conn, cursor, statement, parameters, context, many):
+        context._query_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, many):
+        self._record_statement(context)
+
+    def _statement_failed(self, exception_context):
+        if exception_context.execution_context is not None:
+            self._record_statement(exception_context.execution_context)
+
+    def _record_statement(self, context):
+        started = getattr(context, "_query_started", None)
+        # Errors raised before the statement was sent have no start time
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if has_app_context() and "request_stats" in g:
+            g.request_stats.statements += 1
+            g.request_stats.db_seconds += elapsed
+
+    def _record(
+        self, transport: str, endpoint: str, failed: bool, client_error: bool = False
+    ):
+        stats = g.pop("request_stats")
+        latency = time.perf_counter() - stats.started
+
+        with self._lock:
+            totals = self._endpoints.setdefault((transport, endpoint), EndpointStats())
+            totals.requests += 1
+            if failed:
+                totals.errors += 1
+            if client_error:
+                totals.client_errors += 1
+            totals.statements += stats.statements
+            totals.db_seconds += stats.db_seconds
+            totals.latency_seconds += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    totals.latency_buckets[i] += 1
+
+        if latency * 1000 >= current_app.config["INSTRUMENTATION_SLOW_REQUEST_MS"]:
+            current_app.logger.warning(
+                "Slow %s %s: %.1f ms, %d SQL statements, %.1f ms in database",
+                transport,
+                endpoint,
+                latency * 1000,
+                stats.statements,
+                stats.db_seconds * 1000,
+            )
+
+    def metrics(self):
+        """Serve the collected metrics in the Prometheus text format."""
+        token = current_app.config["INSTRUMENTATION_METRICS_TOKEN"]
+        if token and not hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(),
+            f"Bearer {token}".encode(),
+        ):
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+
+        with self._lock:
+            endpoints = [
+                (
+                    f'transport="{transport}",endpoint="{endpoint}"',
+                    stats.model_copy(deep=True),
+                )
+                for (transport, endpoint), stats in sorted(self._endpoints.items())
+            ]
+
+        lines = []
+        for name, field in (
+            ("legora_requests_total", "requests"),
+            ("legora_request_errors_total", "errors"),
+            ("legora_request_client_errors_total", "client_errors"),
+            ("legora_db_statements_total", "statements"),
+            ("legora_db_seconds_total", "db_seconds"),
+        ):
+            lines.append(f"# TYPE {name} counter")
+            for labels, stats in endpoints:
+                lines.append(f"{name}{{{labels}}} {getattr(stats, field)}")
+
+        name = "legora_request_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for labels, stats in endpoints:
+            for bound, count in zip(LATENCY_BUCKETS, stats.latency_buckets):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines += [
+                f'{name}_bucket{{{labels},le="+Inf"}} {stats.requests}',
+                f"{name}_sum{{{labels}}} {stats.latency_seconds}",
+                f"{name}_count{{{labels}}} {stats.requests}",
+            ]
+
+        for collector in self._collectors:
+            lines += collector()
+
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from flask import Flask
+from werkzeug.security import check_password_hash
+
+
+class LoginBusy(Exception):
+    """Raised when the password hashing pool has no room for another check."""
+
+
+class LoginThrottle:
+    """
+    Fixed-window attempt counter per key, such as a username or client IP.
+    Expired windows are pruned once more than `max_keys` keys are tracked.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 100_000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Tuple[float, int]] = {}
+
+    def hit(self, key: str) -> Optional[float]:
+        """
+        Record an attempt for the key.
+        Returns None if it is allowed, or the seconds until the key's window
+        resets if it is over the limit.
+        """
+        now = time.monotonic()
+        with self._lock:
+            started, count = self._windows.get(key, (now, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            if count >= self.limit:
+                return self.window - (now - started)
+
+            self._windows[key] = (started, count + 1)
+            if len(self._windows) > self.max_keys:
+                self._windows = {
+                    k: v for k, v in self._windows.items() if now - v[0] < self.window
+                }
+        return None
+
+
+class LoginGuard:
+    """
+    Keeps login traffic from starving the rest of the server.
+
+    Password hashes are checked on a bounded pool of worker threads instead of
+    the request worker; when every worker is busy and LOGIN_QUEUE_LIMIT checks
+    are already waiting, further logins are rejected with LoginBusy. Attempts
+    are also throttled per username and per client IP. Under gevent the pool
+    uses gevent's executor, whose real threads run the hash without blocking
+    the event loop.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.executor = None
+        self.slots = None
+        self.timeout = None
+        self.username_throttle = None
+        self.ip_throttle = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.config.setdefault("LOGIN_WORKERS", 4)
+        app.config.setdefault("LOGIN_QUEUE_LIMIT", 32)
+        app.config.setdefault("LOGIN_TIMEOUT", 10)
+        app.config.setdefault("LOGIN_RATE_WINDOW", 60)
+        app.config.setdefault("LOGIN_RATE_LIMIT_PER_USERNAME", 10)
+        app.config.setdefault("LOGIN_RATE_LIMIT_PER_IP", 100)
+
+        executor_class = ThreadPoolExecutor
+        if app.config.get("SOCKETIO_ASYNC_MODE") == "gevent":
+            from gevent.threadpool import ThreadPoolExecutor as executor_class
+
+        workers = app.config["LOGIN_WORKERS"]
+        self.executor = executor_class(max_workers=workers, thread_name_prefix="login")
+        self.slots = threading.BoundedSemaphore(
+            workers + app.config["LOGIN_QUEUE_LIMIT"]
+        )
+        self.timeout = app.config["LOGIN_TIMEOUT"]
+        self.username_throttle = LoginThrottle(
+            app.config["LOGIN_RATE_LIMIT_PER_USERNAME"], app.config["LOGIN_RATE_WINDOW"]
+        )
+        self.ip_throttle = LoginThrottle(
+            app.config["LOGIN_RATE_LIMIT_PER_IP"], app.config["LOGIN_RATE_WINDOW"]
+        )
+
+    def throttle(self, username: str, ip: Optional[str]) -> Optional[float]:
+        """
+        Record a login attempt.
+        Returns None if it may proceed, or the seconds to wait before retrying.
+        """
+        retry_after = self.ip_throttle.hit(ip or "unknown")
+        if retry_after is None:
+            retry_after = self.username_throttle.hit(username)
+        return retry_after
+
+    def check_password(self, password_hash: str, password: str) -> bool:
+        """
+        Check a password against its hash on the worker pool.
+        Raises LoginBusy if the pool and its queue are full.
+        """
+        if not self.slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            future = self.executor.submit(check_password_hash, password_hash, password)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future.result(timeout=self.timeout)
@@ -1,20 +1,76 @@
+import secrets
+import threading
+import time
 import uuid
-from datetime import datetime, timezone
+from typing import Tuple
 
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from db import db
 
 
+def uuid7(timestamp_ms: int, random_bits: int) -> str:
+    """
+    Build a UUIDv7 string from a Unix timestamp in milliseconds and 74 random
+    bits. The timestamp leads, so ids sort roughly by creation time and new
+    rows land at the right edge of primary key indexes.
+    """
+    value = (timestamp_ms & (1 << 48) - 1) << 80
+    value |= 0x7 << 76 | (random_bits >> 62 & 0xFFF) << 64
+    value |= 0b10 << 62 | random_bits & (1 << 62) - 1
+    return str(uuid.UUID(int=value))
+
+
+# Ids are native UUIDs in the database and plain strings in Python
+UuidString = db.Uuid(as_uuid=False)
+
+
+_uuid_lock = threading.Lock()
+_last_uuid = [0, 0]  # timestamp_ms, random_bits of the last generated id
+
+
 def generate_uuid():
-    return str(uuid.uuid4())
+    """
+    Generate a UUIDv7 string. Ids from one process strictly increase: within
+    the same millisecond the random bits are incremented, so inserts append
+    at the right edge of the index instead of splitting pages in the middle.
+    """
+    with _uuid_lock:
+        timestamp_ms = time.time_ns() // 1_000_000
+        last_ms, last_bits = _last_uuid
+        if timestamp_ms > last_ms:
+            random_bits = secrets.randbits(74)
+        else:
+            timestamp_ms = last_ms
+            random_bits = last_bits + secrets.randbits(16) + 1
+            if random_bits >> 74:
+                timestamp_ms, random_bits = last_ms + 1, secrets.randbits(74)
+        _last_uuid[:] = timestamp_ms, random_bits
+    return uuid7(timestamp_ms, random_bits)
+
+
+def is_uuid(value: str) -> bool:
+    """Whether a client-supplied id is a UUID string, in canonical form."""
+    try:
+        return str(uuid.UUID(value)) == value.lower()
+    except (AttributeError, TypeError, ValueError):
+        return False
+
+
+def pair_key(user1_id: str, user2_id: str) -> Tuple[str, str]:
+    """
+    The canonical key of a two-person chat: its participants' ids, lowest
+    first in the database's UUID order, so either user finds the same chat.
+    """
+    low, high = sorted((uuid.UUID(user1_id), uuid.UUID(user2_id)))
+    return str(low), str(high)
 
 
 # User Model
 class User(db.Model):
     __tablename__ = "users"
 
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(UuidString, primary_key=True, default=generate_uuid)
     username = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
 
@@ -32,24 +88,72 @@ class User(db.Model):
 # Association table for chat participants (Many-to-Many)
 chat_participants = db.Table(
     "chat_participants",
-    db.Column("chat_id", db.String(36), db.ForeignKey("chats.id"), primary_key=True),
-    db.Column("user_id", db.String(36), db.ForeignKey("users.id"), primary_key=True),
+    db.Column("chat_id", UuidString, db.ForeignKey("chats.id"), primary_key=True),
+    db.Column("user_id", UuidString, db.ForeignKey("users.id"), primary_key=True),
+    db.Index("ix_chat_participants_user_id_chat_id", "user_id", "chat_id"),
+)
+
+
+# Read position and denormalized unread counter of each participant in a chat.
+# last_read_seq is the seq of the last message read (0 for none); it is not a
+# foreign key so messages can be stored and archived independently.
+chat_read_states = db.Table(
+    "chat_read_states",
+    db.Column("user_id", UuidString, db.ForeignKey("users.id"), primary_key=True),
+    db.Column("chat_id", UuidString, db.ForeignKey("chats.id"), primary_key=True),
+    db.Column("last_read_seq", db.BigInteger, nullable=False, server_default="0"),
+    db.Column("unread_count", db.Integer, nullable=False, server_default="0"),
+    db.Index("ix_chat_read_states_chat_id", "chat_id"),
 )
 
 
 # Message Model
+# Insertion order of messages, used to break ties between equal timestamps
+message_seq = db.Sequence("messages_seq_seq", metadata=db.metadata)
+
+
+# Messages are range-partitioned by month on timestamp (see partitions.py), so
+# the table's primary key is (id, timestamp). Ids are still generated unique
+# and the ORM identifies messages by id alone.
 class Message(db.Model):
     __tablename__ = "messages"
+    __table_args__ = (
+        db.Index("ix_messages_chat_id_timestamp_seq", "chat_id", "timestamp", "seq"),
+        db.Index("ix_messages_chat_id_seq", "chat_id", "seq"),
+        db.Index("ix_messages_seq", "seq"),
+        db.Index("ix_messages_sender_id", "sender_id"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    chat_id = db.Column(db.String(36), db.ForeignKey("chats.id"), nullable=False)
-    sender_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
+    # The timestamp half of the key is server-generated, so the
+    # client-generated id is what matches batched INSERT ... RETURNING rows
+    # back to their parameters; without it SQLAlchemy inserts row by row
+    id = db.Column(
+        UuidString, primary_key=True, default=generate_uuid, insert_sentinel=True
+    )
+    chat_id = db.Column(UuidString, db.ForeignKey("chats.id"), nullable=False)
+    sender_id = db.Column(UuidString, db.ForeignKey("users.id"), nullable=False)
     text = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.now(tz=timezone.utc))
+    timestamp = db.Column(
+        db.DateTime(timezone=True),
+        primary_key=True,
+        server_default=db.func.now(),
+        nullable=False,
+    )
+    seq = db.Column(
+        db.BigInteger,
+        message_seq,
+        server_default=message_seq.next_value(),
+        nullable=False,
+    )
 
     sender = db.relationship("User", backref="messages")
 
+    __mapper_args__ = {"primary_key": [id]}
+
     def __init__(self, chat_id, sender_id, text):
+        # Assigned up front so the id can be referenced before the insert
+        self.id = generate_uuid()
         self.chat_id = chat_id
         self.sender_id = sender_id
         self.text = text
@@ -59,17 +163,40 @@ class Message(db.Model):
 
 
 # Chat Model (Represents a conversation)
+# Creation order of chats, used by clients syncing new chats
+chat_seq = db.Sequence("chats_seq_seq", metadata=db.metadata)
+
+
 class Chat(db.Model):
     __tablename__ = "chats"
+    __table_args__ = (
+        db.Index("ix_chats_seq", "seq"),
+        db.UniqueConstraint("pair_low_id", "pair_high_id", name="uq_chats_pair"),
+    )
 
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    created_at = db.Column(db.DateTime, default=datetime.now(tz=timezone.utc))
-    participants = db.relationship("User", secondary=chat_participants, backref="chats")
-    last_message_id = db.Column(
-        db.String(36), db.ForeignKey("messages.id"), nullable=True
+    id = db.Column(UuidString, primary_key=True, default=generate_uuid)
+    created_at = db.Column(
+        db.DateTime(timezone=True), server_default=db.func.now(), nullable=False
+    )
+    seq = db.Column(
+        db.BigInteger, chat_seq, server_default=chat_seq.next_value(), nullable=False
     )
+    participants = db.relationship("User", secondary=chat_participants, backref="chats")
+    # pair_key of the participants of a two-person chat, unique so two users
+    # can only have one chat; NULL for other chats
+    pair_low_id = db.Column(UuidString, db.ForeignKey("users.id"), nullable=True)
+    pair_high_id = db.Column(UuidString, db.ForeignKey("users.id"), nullable=True)
+    # Not a foreign key, as messages are partitioned; may point at a message
+    # that has since been archived, leaving last_message empty. The message's
+    # timestamp is kept alongside its id so loading it only probes the
+    # partition holding it.
+    last_message_id = db.Column(UuidString, nullable=True)
+    last_message_at = db.Column(db.DateTime(timezone=True), nullable=True)
     last_message = db.relationship(
-        "Message", foreign_keys=[last_message_id], uselist=False
+        "Message",
+        primaryjoin="and_(foreign(Chat.last_message_id) == Message.id, "
+        "foreign(Chat.last_message_at) == Message.timestamp)",
+        uselist=False,
     )
 
     def __init__(self):
@@ -77,3 +204,35 @@ class Chat(db.Model):
 
     def __repr__(self):
         return f"<Chat {self.id}>"
+
+
+# Monthly message partitions detached to compressed files by
+# `flask partitions archive`. Each file holds one gzip member per chat, located
+# by message_archive_chats so a chat's history can be read back on its own.
+message_archives = db.Table(
+    "message_archives",
+    db.Column("id", db.Integer, primary_key=True),
+    db.Column("partition_name", db.String(100), nullable=False, unique=True),
+    db.Column("range_start", db.DateTime(timezone=True), nullable=False),
+    db.Column("range_end", db.DateTime(timezone=True), nullable=False),
+    db.Column("path", db.String(255), nullable=False),
+    db.Column("message_count", db.BigInteger, nullable=False),
+    db.Column(
+        "archived_at",
+        db.DateTime(timezone=True),
+        server_default=db.func.now(),
+        nullable=False,
+    ),
+)
+
+message_archive_chats = db.Table(
+    "message_archive_chats",
+    db.Column(
+        "archive_id", db.Integer, db.ForeignKey("message_archives.id"), primary_key=True
+    ),
+    db.Column("chat_id", UuidString, primary_key=True),
+    db.Column("byte_offset", db.BigInteger, nullable=False),
+    db.Column("byte_length", db.BigInteger, nullable=False),
+    db.Column("message_count", db.Integer, nullable=False),
+    db.Index("ix_message_archive_chats_chat_id", "chat_id"),
+)
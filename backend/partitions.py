@@ -0,0 +1,407 @@
+import gzip
+import itertools
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from pydantic import BaseModel
+from sqlalchemy import insert, select, text
+
+from db import db
+from models import (
+    User,
+    chat_participants,
+    message_archive_chats,
+    message_archives,
+)
+from serialization import dumps
+
+# Monthly partitions of messages are named messages_y<year>m<month>. Rows
+# outside every monthly partition land in messages_default until
+# ensure_partitions moves them out.
+PARTITION_NAME = re.compile(r"^messages_y(\d{4})m(\d{2})$")
+DEFAULT_PARTITION = "messages_default"
+COLUMNS = "id, chat_id, sender_id, text, timestamp, seq"
+
+cli = AppGroup("partitions", help="Manage monthly partitions of messages.")
+
+
+class ArchivedMessage(BaseModel):
+    """A message read back from an archive, shaped like a history row."""
+
+    id: str
+    chat_id: str
+    sender: str
+    text: str
+    timestamp: datetime
+    seq: int
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"messages_y{month.year:04d}m{month.month:02d}"
+
+
+def list_partitions() -> List[datetime]:
+    """The months of the monthly partitions attached to messages, oldest first."""
+    names = db.session.execute(text("""
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = 'messages'::regclass
+            """)).scalars()
+    months = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            year, month = map(int, match.groups())
+            months.append(datetime(year, month, 1, tzinfo=timezone.utc))
+    return sorted(months)
+
+
+def ensure_partitions(
+    months_ahead: int = 3, since: Optional[datetime] = None
+) -> List[str]:
+    """
+    Create the monthly partitions missing from `since` (default: the current
+    month) to `months_ahead` months from now.
+    Rows that landed in the default partition for lack of a monthly one are
+    moved into newly created partitions; this locks messages while it runs.
+    Returns the names of the created partitions.
+    """
+    current = month_start(datetime.now(timezone.utc))
+    first = month_start(since) if since else current
+    last = add_months(current, months_ahead)
+
+    oldest, newest = db.session.execute(
+        text(f"SELECT min(timestamp), max(timestamp) FROM {DEFAULT_PARTITION}")
+    ).one()
+    if oldest is not None:
+        first = min(first, month_start(oldest))
+        last = max(last, month_start(newest))
+
+    existing = set(list_partitions())
+    missing = []
+    month = first
+    while month <= last:
+        if month not in existing:
+            missing.append(month)
+        month = add_months(month, 1)
+    if not missing:
+        return []
+
+    # A new partition cannot be attached while the default partition holds
+    # rows in its range, so take those rows out and route them again
+    if oldest is not None:
+        db.session.execute(
+            text(f"ALTER TABLE messages DETACH PARTITION {DEFAULT_PARTITION}")
+        )
+    for month in missing:
+        db.session.execute(
+            text(
+                f"CREATE TABLE {partition_name(month)} PARTITION OF messages "
+                f"FOR VALUES FROM ('{month.isoformat()}') "
+                f"TO ('{add_months(month, 1).isoformat()}')"
+            )
+        )
+    if oldest is not None:
+        db.session.execute(
+            text(
+                f"INSERT INTO messages ({COLUMNS}) "
+                f"SELECT {COLUMNS} FROM {DEFAULT_PARTITION}"
+            )
+        )
+        db.session.execute(text(f"TRUNCATE {DEFAULT_PARTITION}"))
+        db.session.execute(
+            text(f"ALTER TABLE messages ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+        )
+    db.session.commit()
+    return [partition_name(month) for month in missing]
+
+
+def analyze_messages():
+    """
+    Refresh the planner statistics of messages as a whole. Autovacuum analyzes
+    each partition but never the partitioned table, whose statistics plans
+    joining messages depend on.
+    """
+    db.session.execute(text("ANALYZE messages"))
+    db.session.commit()
+
+
+def archive_partition(month: datetime, archive_dir: str) -> int:
+    """
+    Write a monthly partition to a gzip file of NDJSON rows in `archive_dir`,
+    record it in message_archives, then detach and drop the partition.
+    The file holds one gzip member per chat, with the chat's rows in
+    (timestamp, seq) order, so one chat can be read without decompressing the
+    rest. Returns the number of archived messages.
+    """
+    name = partition_name(month)
+    filename = f"{name}.ndjson.gz"
+    path = os.path.join(archive_dir, filename)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    rows = db.session.execute(
+        text(f"SELECT {COLUMNS} FROM {name} ORDER BY chat_id, timestamp, seq"),
+        execution_options={"yield_per": 10_000},
+    )
+    chats = []
+    message_count = 0
+    with open(path + ".tmp", "wb") as archive:
+        for chat_id, messages in itertools.groupby(rows, key=lambda row: row.chat_id):
+            lines = [
+                dumps(
+                    {
+                        "id": str(row.id),
+                        "chat_id": str(row.chat_id),
+                        "sender_id": str(row.sender_id),
+                        "text": row.text,
+                        "timestamp": row.timestamp,
+                        "seq": row.seq,
+                    }
+                )
+                for row in messages
+            ]
+            member = gzip.compress(b"\n".join(lines) + b"\n")
+            chats.append(
+                {
+                    "chat_id": str(chat_id),
+                    "byte_offset": archive.tell(),
+                    "byte_length": len(member),
+                    "message_count": len(lines),
+                }
+            )
+            archive.write(member)
+            message_count += len(lines)
+        archive.flush()
+        os.fsync(archive.fileno())
+    os.replace(path + ".tmp", path)
+
+    archive_id = db.session.execute(
+        insert(message_archives)
+        .values(
+            partition_name=name,
+            range_start=month,
+            range_end=add_months(month, 1),
+            path=filename,
+            message_count=message_count,
+        )
+        .returning(message_archives.c.id)
+    ).scalar_one()
+    chats = iter(chats)
+    while batch := list(itertools.islice(chats, 10_000)):
+        db.session.execute(
+            insert(message_archive_chats),
+            [{"archive_id": archive_id, **chat} for chat in batch],
+        )
+    db.session.execute(text(f"ALTER TABLE messages DETACH PARTITION {name}"))
+    db.session.execute(text(f"DROP TABLE {name}"))
+    db.session.commit()
+    return message_count
+
+
+def archive_partitions(
+    older_than_months: int, archive_dir: str
+) -> List[Tuple[str, int]]:
+    """
+    Archive every monthly partition that ended more than `older_than_months`
+    months before the start of the current month.
+    Returns (partition name, message count) for each archived partition.
+    """
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), -older_than_months)
+    archived = []
+    for month in list_partitions():
+        if add_months(month, 1) <= cutoff:
+            archived.append(
+                (partition_name(month), archive_partition(month, archive_dir))
+            )
+    return archived
+
+
+def _archived_chat_query(chat_id: str):
+    """Locations of a chat's blocks in the archive files."""
+    return (
+        select(
+            message_archives.c.path,
+            message_archive_chats.c.byte_offset,
+            message_archive_chats.c.byte_length,
+        )
+        .join(
+            message_archives,
+            message_archives.c.id == message_archive_chats.c.archive_id,
+        )
+        .where(message_archive_chats.c.chat_id == chat_id)
+    )
+
+
+def _read_archived_chat(
+    archive_dir: str, path: str, offset: int, length: int
+) -> List[dict]:
+    """The message records of one chat's block, in (timestamp, seq) order."""
+    with open(os.path.join(archive_dir, path), "rb") as archive:
+        archive.seek(offset)
+        member = gzip.decompress(archive.read(length))
+    records = []
+    for line in member.splitlines():
+        record = json.loads(line)
+        record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+        records.append(record)
+    return records
+
+
+def read_archived_messages(
+    chat_id: str,
+    before: Optional[Tuple[datetime, int]] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 50,
+) -> List[ArchivedMessage]:
+    """
+    Read up to `limit` archived messages of a chat, positioned by
+    (timestamp, seq) like get_messages_by_chat_id: the newest ones before
+    `before` (or overall), newest first, or the oldest ones after `after`,
+    oldest first.
+    Only the archive files holding the chat are opened.
+    """
+    query = _archived_chat_query(chat_id)
+    if after is not None:
+        query = query.where(message_archives.c.range_end > after[0]).order_by(
+            message_archives.c.range_start
+        )
+    else:
+        if before is not None:
+            query = query.where(message_archives.c.range_start <= before[0])
+        query = query.order_by(message_archives.c.range_start.desc())
+
+    archive_dir = current_app.config["MESSAGE_ARCHIVE_DIR"]
+    records = []
+    for path, offset, length in db.session.execute(query):
+        chunk = []
+        for record in _read_archived_chat(archive_dir, path, offset, length):
+            position = (record["timestamp"], record["seq"])
+            if (after is None or position > after) and (
+                before is None or position < before
+            ):
+                chunk.append(record)
+        if after is None:
+            chunk.reverse()
+        records += chunk[: limit - len(records)]
+        if len(records) >= limit:
+            break
+
+    usernames = {}
+    if records:
+        sender_ids = {record["sender_id"] for record in records}
+        usernames = dict(
+            db.session.query(User.id, User.username).filter(User.id.in_(sender_ids))
+        )
+    return [
+        ArchivedMessage(sender=usernames.get(record["sender_id"], ""), **record)
+        for record in records
+    ]
+
+
+def stream_archived_messages(
+    chat_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[ArchivedMessage]:
+    """
+    Stream the archived messages of a chat with a timestamp in [start, end),
+    oldest first, for exports.
+    The archives holding the chat and the participants' usernames are looked
+    up when this is called; the chat's blocks are then read one at a time as
+    the messages are consumed.
+    """
+    query = _archived_chat_query(chat_id).order_by(message_archives.c.range_start)
+    if start is not None:
+        query = query.where(message_archives.c.range_end > start)
+    if end is not None:
+        query = query.where(message_archives.c.range_start < end)
+    blocks = db.session.execute(query).all()
+    usernames = {}
+    if blocks:
+        usernames = dict(
+            db.session.query(User.id, User.username)
+            .join(chat_participants, chat_participants.c.user_id == User.id)
+            .filter(chat_participants.c.chat_id == chat_id)
+        )
+    return _stream_archived_chat(
+        current_app.config["MESSAGE_ARCHIVE_DIR"], blocks, usernames, start, end
+    )
+
+
+def _stream_archived_chat(
+    archive_dir: str,
+    blocks: List[Tuple[str, int, int]],
+    usernames: Dict[str, str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> Iterator[ArchivedMessage]:
+    for path, offset, length in blocks:
+        for record in _read_archived_chat(archive_dir, path, offset, length):
+            if (start is None or record["timestamp"] >= start) and (
+                end is None or record["timestamp"] < end
+            ):
+                yield ArchivedMessage(
+                    sender=usernames.get(record["sender_id"], ""), **record
+                )
+
+
+@cli.command("ensure")
+@click.option("--months-ahead", default=3, show_default=True)
+def ensure_command(months_ahead):
+    """
+    Create missing monthly partitions up to MONTHS_AHEAD months ahead and
+    refresh the statistics of messages. Meant to run daily.
+    """
+    created = ensure_partitions(months_ahead)
+    for name in created:
+        click.echo(f"Created {name}")
+    if not created:
+        click.echo("All partitions exist.")
+    analyze_messages()
+
+
+@cli.command("archive")
+@click.option("--older-than-months", default=12, show_default=True)
+def archive_command(older_than_months):
+    """
+    Archive partitions older than OLDER_THAN_MONTHS full months to
+    MESSAGE_ARCHIVE_DIR.
+    """
+    archived = archive_partitions(
+        older_than_months, current_app.config["MESSAGE_ARCHIVE_DIR"]
+    )
+    for name, message_count in archived:
+        click.echo(f"Archived {name} ({message_count} messages)")
+    if not archived:
+        click.echo("No partitions to archive.")
+
+
+@cli.command("list")
+def list_command():
+    """List attached monthly partitions and archives."""
+    for month in list_partitions():
+        click.echo(f"{partition_name(month)}\tattached")
+    for name, path, message_count in db.session.execute(
+        select(
+            message_archives.c.partition_name,
+            message_archives.c.path,
+            message_archives.c.message_count,
+        ).order_by(message_archives.c.range_start)
+    ):
+        click.echo(f"{name}\tarchived to {path} ({message_count} messages)")
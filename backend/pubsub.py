@@ -0,0 +1,97 @@
+import queue
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import socketio
+
+MEMORY_QUEUE_SCHEME = "memory"
+
+
+class InMemoryBus:
+    """
+    A process-local pub/sub bus.
+    Every subscriber to a channel gets its own queue of published messages.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[queue.Queue]] = {}
+
+    def subscribe(self, channel: str) -> queue.Queue:
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(subscriber)
+        return subscriber
+
+    def publish(self, channel: str, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+
+_buses: Dict[str, InMemoryBus] = {}
+_buses_lock = threading.Lock()
+
+
+def get_bus(name: str) -> InMemoryBus:
+    """
+    Retrieve the in-memory bus with the given name, creating it if needed.
+    """
+    with _buses_lock:
+        return _buses.setdefault(name, InMemoryBus())
+
+
+class InMemoryManager(socketio.PubSubManager):
+    """
+    Socket.IO client manager backed by an InMemoryBus.
+
+    Behaves like the Redis manager, but only between Socket.IO servers in the
+    same process, which is enough to exercise cross-server room fan-out in
+    tests without running a broker. The URL host names the bus, so
+    `memory://a` and `memory://b` are isolated from each other.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        url: str = "memory://",
+        channel: str = "flask-socketio",
+        write_only: bool = False,
+        logger=None,
+        json=None,
+    ):
+        super().__init__(
+            channel=channel, write_only=write_only, logger=logger, json=json
+        )
+        self.bus = get_bus(urlparse(url).netloc)
+        self.subscription = None
+
+    def initialize(self):
+        if not self.write_only:
+            self.subscription = self.bus.subscribe(self.channel)
+        super().initialize()
+
+    def _publish(self, data):
+        # Round-trip through JSON like a real broker would
+        self.bus.publish(self.channel, self.json.dumps(data))
+
+    def _listen(self):
+        while True:
+            yield self.subscription.get()
+
+
+def message_queue_options(url: Optional[str]) -> dict:
+    """
+    Build the SocketIO options for the given message queue URL.
+    `memory://` selects the in-process manager, any other URL (for example
+    `redis://localhost:6379/0`) is handed to Flask-SocketIO, and no URL keeps
+    rooms local to this process.
+    """
+    if not url:
+        return {}
+    if urlparse(url).scheme == MEMORY_QUEUE_SCHEME:
+        return {"client_manager": InMemoryManager(url)}
+    return {"message_queue": url}
@@ -1,8 +1,81 @@
-from typing import Optional, List
-from models import User, Chat, Message
-from db import db
+import collections
+import heapq
+from datetime import datetime, timedelta
+from typing import FrozenSet, Iterable, Iterator, Optional, List, Set, Tuple
 
+from pydantic import BaseModel
+from sqlalchemy import (
+    Row,
+    and_,
+    bindparam,
+    case,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
+from cache import TTLCache
+from models import (
+    User,
+    Chat,
+    Message,
+    chat_participants,
+    chat_read_states,
+    generate_uuid,
+    is_uuid,
+    pair_key,
+)
+from db import db, read_only
+from partitions import (
+    add_months,
+    month_start,
+    read_archived_messages,
+    stream_archived_messages,
+)
+
+DEFAULT_MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+MAX_MESSAGE_BATCH_SIZE = 1000
+MAX_SYNC_MESSAGES = 1000
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+EXPORT_BATCH_SIZE = 1000
+LAST_MESSAGE_SLACK = timedelta(minutes=1)
+
+# Users never change and chat membership only changes in create_chat, so
+# authorization lookups are cached per process. Sizes and TTL are set from
+# the app config by configure_caches.
+user_cache = TTLCache(maxsize=10_000, ttl=300)
+chat_participants_cache = TTLCache(maxsize=50_000, ttl=300)
+
+
+class UserRecord(BaseModel):
+    id: str
+    username: str
+
+
+class ReadState(BaseModel):
+    message_id: Optional[str]
+    unread_count: int
+
+
+def configure_caches(max_users: int, max_chats: int, ttl: float):
+    """Resize the user and chat participant caches and drop their entries."""
+    user_cache.maxsize = max_users
+    chat_participants_cache.maxsize = max_chats
+    for cache in (user_cache, chat_participants_cache):
+        cache.ttl = ttl
+        cache.invalidate()
+
+
+@read_only
 def get_user_by_username(username: str) -> User | None:
     """
     Retrieve a user by their username.
@@ -10,6 +83,7 @@ def get_user_by_username(username: str) -> User | None:
     return db.session.query(User).filter_by(username=username).first()
 
 
+@read_only
 def get_user_by_id(user_id: str) -> Optional[User]:
     """
     Retrieve a user from the database by user ID.
@@ -18,65 +92,629 @@ def get_user_by_id(user_id: str) -> Optional[User]:
     return User.query.get(user_id)
 
 
-def get_chat_by_id(chat_id: str) -> Optional[Chat]:
+def _user_record(query) -> Optional[UserRecord]:
+    row = query.with_entities(User.id, User.username).first()
+    return UserRecord(id=row.id, username=row.username) if row else None
+
+
+@read_only
+def get_user_record(user_id: str) -> Optional[UserRecord]:
+    """
+    Retrieve a user's id and username by user ID, through the user cache.
+    Returns None if no user is found.
+    """
+    return user_cache.get(
+        ("id", user_id), lambda: _user_record(User.query.filter_by(id=user_id))
+    )
+
+
+@read_only
+def get_user_record_by_username(username: str) -> Optional[UserRecord]:
+    """
+    Retrieve a user's id and username by username, through the user cache.
+    Returns None if no user is found.
+    """
+    return user_cache.get(
+        ("username", username),
+        lambda: _user_record(User.query.filter_by(username=username)),
+    )
+
+
+def get_chat_participant_ids(chat_id: str) -> Optional[FrozenSet[str]]:
+    """
+    Retrieve the user IDs of a chat's participants, through the chat
+    participant cache.
+    Returns None if the chat does not exist.
+    """
+    if not is_uuid(chat_id):
+        return None
+
+    def load():
+        rows = db.session.query(chat_participants.c.user_id).filter(
+            chat_participants.c.chat_id == chat_id
+        )
+        return frozenset(row.user_id for row in rows) or None
+
+    return chat_participants_cache.get(chat_id, load)
+
+
+def _history_windows(
+    created_at: datetime,
+    last_message_at: Optional[datetime],
+    before: Optional[Tuple[datetime, int]],
+    after: Optional[Tuple[datetime, int]],
+) -> Iterator[Tuple[Optional[datetime], Optional[datetime]]]:
+    """
+    Timestamp ranges [start, end) to read a chat's history from, in the
+    direction of travel, up to just after its last message; None leaves a side
+    open.
+    Ranges end on month boundaries and double in length, so each query plans
+    only the few partitions in its range and long histories need few queries.
+    Ranges reach back to the chat's creation, after which the oldest range is
+    open: chats created before created_at had a server default were stamped
+    when the app started, which can be later than their messages.
+    """
+    # A message committed after the chat was read can be newer than
+    # last_message_at, by at most the time between the two reads
+    newest = last_message_at + LAST_MESSAGE_SLACK if last_message_at else None
+    if after is not None:
+        start, months = after[0], 1
+        end = add_months(month_start(max(start, created_at)), months)
+        while newest is not None and end < newest:
+            yield start, end
+            start, months = end, months * 2
+            end = add_months(start, months)
+        yield start, newest
+    else:
+        # Pages before a cursor are bounded by the cursor
+        end = newest if before is None else None
+        start, months = month_start(before[0] if before else newest or created_at), 1
+        while start > created_at:
+            yield start, end
+            end, months = start, months * 2
+            start = add_months(end, -months)
+        yield None, end
+
+
+@read_only
+def get_messages_by_chat_id(
+    chat_id: str,
+    before: Optional[Tuple[datetime, int]] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = DEFAULT_MESSAGE_PAGE_SIZE,
+) -> Tuple[List[Row], bool]:
+    """
+    Retrieve one page of messages for a given chat ID using keyset pagination
+    over (timestamp, seq).
+    `before`/`after` are (timestamp, seq) positions to page backwards/forwards
+    from; with neither, the most recent messages are returned.
+    Rows carry only id, chat_id, sender (username), text, timestamp and seq, so
+    no Message/User objects are built. Messages are read in timestamp ranges
+    (see _history_windows) so the planner prunes the partitions outside them.
+    Pages that come back short, and pages forwards, which may start in archived
+    months, are completed from the archives holding the chat, whose rows carry
+    the same fields.
+    Returns the page ordered oldest first, and whether more messages exist
+    beyond it in the direction of travel.
+    """
+    chat = db.session.execute(
+        select(Chat.created_at, Chat.last_message_at).where(Chat.id == chat_id)
+    ).one_or_none()
+    if chat is None:
+        return [], False
+
+    position = tuple_(Message.timestamp, Message.seq)
+    query = (
+        db.session.query(
+            Message.id,
+            Message.chat_id,
+            User.username.label("sender"),
+            Message.text,
+            Message.timestamp,
+            Message.seq,
+        )
+        .join(User, Message.sender_id == User.id)
+        .filter(Message.chat_id == chat_id)
+    )
+
+    # The row comparisons do not prune partitions, so the cursor's timestamp
+    # is also compared on its own
+    if after is not None:
+        query = query.filter(
+            Message.timestamp >= after[0], position > tuple_(*after)
+        ).order_by(Message.timestamp, Message.seq)
+    else:
+        if before is not None:
+            query = query.filter(
+                Message.timestamp <= before[0], position < tuple_(*before)
+            )
+        query = query.order_by(Message.timestamp.desc(), Message.seq.desc())
+
+    messages = []
+    for start, end in _history_windows(
+        chat.created_at, chat.last_message_at, before, after
+    ):
+        window = query
+        if start is not None:
+            window = window.filter(Message.timestamp >= start)
+        if end is not None:
+            window = window.filter(Message.timestamp < end)
+        messages += window.limit(limit + 1 - len(messages)).all()
+        if len(messages) > limit:
+            break
+
+    if after is not None or len(messages) <= limit:
+        archived = read_archived_messages(
+            chat_id, before=before, after=after, limit=limit + 1
+        )
+        if archived:
+            messages = sorted(
+                messages + archived,
+                key=lambda message: (message.timestamp, message.seq),
+                reverse=after is None,
+            )[: limit + 1]
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+
+    if after is None:
+        messages.reverse()
+    return messages, has_more
+
+
+@read_only
+def search_messages(
+    user_id: str,
+    query: str,
+    chat_id: Optional[str] = None,
+    limit: int = DEFAULT_SEARCH_PAGE_SIZE,
+    offset: int = 0,
+) -> Tuple[List[Row], bool]:
     """
-    Retrieve a chat from the database by chat ID.
-    Returns the Chat object if found, or None if no chat is found.
+    Search the text of messages in the user's chats, or in one of them.
+    The query is parsed with websearch_to_tsquery (quoted phrases, OR and
+    -word work) and matched against the GIN-indexed messages.search_vector
+    column, best matches first.
+    Rows carry the same columns as get_messages_by_chat_id plus rank.
+    Returns one page of results, and whether there are more.
     """
-    return Chat.query.get(chat_id)
+    search = (
+        db.session.query(
+            Message.id,
+            Message.chat_id,
+            User.username.label("sender"),
+            Message.text,
+            Message.timestamp,
+            Message.seq,
+        )
+        .join(User, Message.sender_id == User.id)
+        .join(chat_participants, chat_participants.c.chat_id == Message.chat_id)
+        .filter(chat_participants.c.user_id == user_id)
+    )
+    if chat_id is not None:
+        search = search.filter(Message.chat_id == chat_id)
 
+    # search_vector is a generated column created by migration only
+    search_vector = literal_column("messages.search_vector")
+    ts_query = func.websearch_to_tsquery("simple", query)
+    rank = func.ts_rank_cd(search_vector, ts_query)
+    search = (
+        search.add_columns(rank.label("rank"))
+        .filter(search_vector.op("@@")(ts_query))
+        .order_by(rank.desc(), Message.seq.desc())
+    )
 
-def get_messages_by_chat_id(chat_id: str) -> List[Message]:
+    results = search.offset(offset).limit(limit + 1).all()
+    return results[:limit], len(results) > limit
+
+
+@read_only
+def get_chat_summaries_by_user_id(
+    user_id: str, created_after: Optional[Tuple[int, int]] = None
+) -> List[Row]:
+    """
+    Retrieve all chats that a given user is a participant in, for the chat list.
+    Participant usernames and the last message with its sender are loaded
+    eagerly, so the whole list costs three statements regardless of chat count.
+    `created_after` is an optional (after, up_to) range of chat seqs, to only
+    return chats created in it.
+    Returns rows of (Chat, unread_count), with the user's unread message count
+    for each chat.
+    """
+    query = (
+        db.session.query(Chat, func.coalesce(chat_read_states.c.unread_count, 0))
+        .join(chat_participants, chat_participants.c.chat_id == Chat.id)
+        .outerjoin(
+            chat_read_states,
+            (chat_read_states.c.chat_id == Chat.id)
+            & (chat_read_states.c.user_id == user_id),
+        )
+        .filter(chat_participants.c.user_id == user_id)
+        .options(selectinload(Chat.participants).load_only(User.username))
+    )
+    if created_after is not None:
+        after, up_to = created_after
+        query = query.filter(Chat.seq > after, Chat.seq <= up_to).order_by(Chat.seq)
+    rows = query.all()
+
+    # Joining last_message would plan a scan of every partition; looked up
+    # month by month, only the partitions holding last messages are planned
+    last_message_ids = collections.defaultdict(list)
+    for chat, _ in rows:
+        if chat.last_message_id is not None:
+            month = month_start(chat.last_message_at)
+            last_message_ids[month].append(chat.last_message_id)
+    last_messages = {}
+    if last_message_ids:
+        last_messages = {
+            message.id: message
+            for message in db.session.scalars(
+                select(Message)
+                .where(
+                    or_(
+                        *(
+                            and_(
+                                Message.timestamp >= month,
+                                Message.timestamp < add_months(month, 1),
+                                Message.id.in_(ids),
+                            )
+                            for month, ids in last_message_ids.items()
+                        )
+                    )
+                )
+                .options(joinedload(Message.sender).load_only(User.username))
+            )
+        }
+    for chat, _ in rows:
+        set_committed_value(
+            chat, "last_message", last_messages.get(chat.last_message_id)
+        )
+    return rows
+
+
+@read_only
+def get_sync_position(grace_seconds: float = 0) -> Row:
+    """
+    Retrieve the sync position: the highest committed message and chat seqs,
+    and the sync horizon, the highest seqs of messages and chats created more
+    than `grace_seconds` ago.
+    Seqs are taken at INSERT time, so a transaction still in flight may
+    commit a lower seq than the highest committed one. Insert transactions
+    finish well within the grace period, so every seq up to the horizon has
+    been committed or rolled back, and syncs resume from there.
+    Returns a row of message_seq, chat_seq, message_horizon and chat_horizon.
+    """
+    cutoff = func.now() - timedelta(seconds=grace_seconds)
+    return db.session.query(
+        select(func.coalesce(func.max(Message.seq), 0))
+        .scalar_subquery()
+        .label("message_seq"),
+        select(func.coalesce(func.max(Chat.seq), 0))
+        .scalar_subquery()
+        .label("chat_seq"),
+        select(func.coalesce(func.max(Message.seq), 0))
+        .where(Message.timestamp < cutoff)
+        .scalar_subquery()
+        .label("message_horizon"),
+        select(func.coalesce(func.max(Chat.seq), 0))
+        .where(Chat.created_at < cutoff)
+        .scalar_subquery()
+        .label("chat_horizon"),
+    ).one()
+
+
+@read_only
+def get_messages_since(
+    user_id: str, after: int, up_to: int, limit: int = MAX_SYNC_MESSAGES
+) -> Tuple[List[Row], bool]:
     """
-    Retrieve all messages for a given chat ID.
-    Returns a list of Message objects.
+    Retrieve messages in all of a user's chats with a seq in (after, up_to],
+    oldest first, for clients catching up after a reconnect.
+    Rows carry the same columns as get_messages_by_chat_id.
+    Returns at most `limit` messages, and whether more exist in the range.
     """
-    return Message.query.filter_by(chat_id=chat_id).order_by(Message.timestamp).all()
+    messages = (
+        db.session.query(
+            Message.id,
+            Message.chat_id,
+            User.username.label("sender"),
+            Message.text,
+            Message.timestamp,
+            Message.seq,
+        )
+        .join(User, Message.sender_id == User.id)
+        .join(chat_participants, chat_participants.c.chat_id == Message.chat_id)
+        .filter(
+            chat_participants.c.user_id == user_id,
+            Message.seq > after,
+            Message.seq <= up_to,
+        )
+        .order_by(Message.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    return messages[:limit], len(messages) > limit
 
 
-def get_chats_by_user_id(user_id: str) -> List[Chat]:
+@read_only
+def stream_chat_messages(
+    chat_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[Row]:
     """
-    Retrieve all chats that a given user is a participant in.
-    Returns a list of Chat objects.
+    Stream all messages in a chat with a timestamp in [start, end), oldest
+    first, for exports, including those in archived months.
+    Rows carry the same columns as get_messages_by_chat_id and are fetched
+    EXPORT_BATCH_SIZE at a time through a server-side cursor, so memory use
+    does not grow with the size of the chat; archived messages are read one
+    archived month at a time. The queries run when this is called; consume the
+    rows before the session ends.
     """
-    return Chat.query.filter(Chat.participants.any(id=user_id)).all()
+    query = (
+        db.session.query(
+            Message.id,
+            Message.chat_id,
+            User.username.label("sender"),
+            Message.text,
+            Message.timestamp,
+            Message.seq,
+        )
+        .join(User, Message.sender_id == User.id)
+        .filter(Message.chat_id == chat_id)
+    )
+    if start is not None:
+        query = query.filter(Message.timestamp >= start)
+    if end is not None:
+        query = query.filter(Message.timestamp < end)
+
+    archived = stream_archived_messages(chat_id, start=start, end=end)
+    # iter() executes the query now, inside read_only, rather than on the
+    # first row
+    live = iter(
+        query.order_by(Message.timestamp, Message.seq).yield_per(EXPORT_BATCH_SIZE)
+    )
+    return heapq.merge(
+        archived, live, key=lambda message: (message.timestamp, message.seq)
+    )
 
 
-def create_chat(participants: List[User]) -> Chat:
+def create_chat(participants: List[User]) -> Optional[Chat]:
     """
     Create a new chat with the given participants.
-    Returns the created Chat object.
+    A chat between two users is keyed by their pair_key and inserted with
+    ON CONFLICT DO NOTHING, so concurrent requests for the same pair create
+    a single chat.
+    Returns the created Chat object, or None if the two users already have a
+    chat.
     """
-    new_chat = Chat()
-    new_chat.participants.extend(participants)
-    db.session.add(new_chat)
+    values = {}
+    if len(participants) == 2:
+        values["pair_low_id"], values["pair_high_id"] = pair_key(
+            participants[0].id, participants[1].id
+        )
+    new_chat = db.session.scalar(
+        postgresql.insert(Chat)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=["pair_low_id", "pair_high_id"])
+        .returning(Chat)
+    )
+    if new_chat is None:
+        db.session.rollback()
+        return None
+    db.session.execute(
+        insert(chat_participants),
+        [{"chat_id": new_chat.id, "user_id": user.id} for user in participants],
+    )
+    db.session.execute(
+        insert(chat_read_states),
+        [{"user_id": user.id, "chat_id": new_chat.id} for user in participants],
+    )
     db.session.commit()
+    chat_participants_cache.invalidate(new_chat.id)
     return new_chat
 
 
+def _precedes(timestamp):
+    """
+    Whether a chat's last message is not newer than `timestamp`. Timestamps
+    are taken when the sending transaction starts, so of two concurrent sends
+    the later one to commit may be the older; it must not replace the chat's
+    last message.
+    """
+    return or_(Chat.last_message_at.is_(None), Chat.last_message_at <= timestamp)
+
+
 def create_message(chat_id: str, sender_id: str, text: str) -> Message:
     """
     Create a new message to a chat.
-    Updates the chat's last_message_id.
-    Returns the created Message object.
+    Updates the chat's last message with a single UPDATE, without loading
+    the chat, unless it already has a newer one, and the participants' read
+    states, in the same transaction as the insert.
+    Returns the created Message object, detached from the session so reading
+    it after the commit does not reload it from the database.
     """
     new_message = Message(chat_id=chat_id, sender_id=sender_id, text=text)
     db.session.add(new_message)
+    # Insert first, for the server-generated timestamp
+    db.session.flush()
+    db.session.execute(
+        update(Chat)
+        .where(Chat.id == chat_id, _precedes(new_message.timestamp))
+        .values(last_message_id=new_message.id, last_message_at=new_message.timestamp)
+    )
+    _update_read_states(sender_id, [(chat_id, 1, new_message.seq)])
+    db.session.expunge(new_message)
+    db.session.commit()
+    return new_message
 
-    chat = get_chat_by_id(chat_id)
-    if chat:
-        chat.last_message_id = new_message.id
 
+def get_member_chat_ids(user_id: str, chat_ids: Iterable[str]) -> Set[str]:
+    """
+    Of the given chat IDs, return those the user is a participant in.
+    """
+    rows = db.session.query(chat_participants.c.chat_id).filter(
+        chat_participants.c.user_id == user_id,
+        chat_participants.c.chat_id.in_([c for c in chat_ids if is_uuid(c)]),
+    )
+    return {row.chat_id for row in rows}
+
+
+def create_messages(sender_id: str, messages: List[Tuple[str, str]]) -> List[Row]:
+    """
+    Create many messages from one sender, given as (chat_id, text) pairs.
+    All rows go in one multi-row INSERT, and each affected chat's last
+    message and read states are updated once, in a single transaction.
+    Returns rows of id, chat_id, text, timestamp and seq in input order.
+    """
+    new_messages = db.session.execute(
+        insert(Message).returning(
+            Message.id,
+            Message.chat_id,
+            Message.text,
+            Message.timestamp,
+            Message.seq,
+            sort_by_parameter_order=True,
+        ),
+        [
+            {
+                "id": generate_uuid(),
+                "chat_id": chat_id,
+                "sender_id": sender_id,
+                "text": text,
+            }
+            for chat_id, text in messages
+        ],
+    ).all()
+
+    last_messages = {}
+    counts = {}
+    for message in new_messages:
+        last = last_messages.get(message.chat_id)
+        if last is None or message.seq > last.seq:
+            last_messages[message.chat_id] = message
+        counts[message.chat_id] = counts.get(message.chat_id, 0) + 1
+
+    db.session.execute(
+        update(Chat.__table__)
+        .where(Chat.id == bindparam("b_chat_id"), _precedes(bindparam("b_at")))
+        .values(
+            last_message_id=bindparam("b_message_id"), last_message_at=bindparam("b_at")
+        ),
+        [
+            {
+                "b_chat_id": chat_id,
+                "b_message_id": message.id,
+                "b_at": message.timestamp,
+            }
+            for chat_id, message in last_messages.items()
+        ],
+    )
+    _update_read_states(
+        sender_id,
+        [
+            (chat_id, counts[chat_id], message.seq)
+            for chat_id, message in last_messages.items()
+        ],
+    )
     db.session.commit()
-    return new_message
+    return new_messages
 
 
-def check_chat_exists(user1_id: str, user2_id: str) -> Optional[Chat]:
+def _update_read_states(sender_id: str, chats: List[Tuple[str, int, int]]):
     """
-    Check if two users have a chat.
+    Apply new messages to read states, given (chat_id, message count, last
+    seq) per chat. Other participants' unread counts go up by the count; the
+    sender has read up to their own last message.
     """
-    chat = Chat.query.filter(
-        Chat.participants.any(id=user1_id), Chat.participants.any(id=user2_id)
-    ).first()
+    sender = chat_read_states.c.user_id == sender_id
+    db.session.execute(
+        update(chat_read_states)
+        .where(chat_read_states.c.chat_id == bindparam("b_chat_id"))
+        .values(
+            unread_count=case(
+                (sender, 0),
+                else_=chat_read_states.c.unread_count + bindparam("b_count"),
+            ),
+            last_read_seq=case(
+                (sender, bindparam("b_seq")), else_=chat_read_states.c.last_read_seq
+            ),
+        ),
+        [
+            {"b_chat_id": chat_id, "b_count": count, "b_seq": seq}
+            for chat_id, count, seq in chats
+        ],
+    )
 
-    return chat
+
+def mark_chat_read(
+    user_id: str, chat_id: str, message_id: Optional[str] = None
+) -> Optional[ReadState]:
+    """
+    Move a user's read position in a chat up to a message, by default the
+    chat's last message. The position never moves backwards, and the unread
+    count is recomputed from the messages after it.
+    Returns the message read up to (None if the position did not move) and
+    the unread count, or None if the message is not in the chat.
+    """
+    if message_id is not None:
+        if not is_uuid(message_id):
+            return None
+        target = (
+            db.session.query(Message.id, Message.seq)
+            .filter(Message.id == message_id, Message.chat_id == chat_id)
+            .first()
+        )
+        if target is None:
+            return None
+    else:
+        target = (
+            db.session.query(Message.id, Message.seq)
+            .join(
+                Chat,
+                (Chat.last_message_id == Message.id)
+                & (Chat.last_message_at == Message.timestamp),
+            )
+            .filter(Chat.id == chat_id)
+            .first()
+        )
+
+    state = (chat_read_states.c.user_id == user_id) & (
+        chat_read_states.c.chat_id == chat_id
+    )
+    moved = None
+    if target is not None:
+        unread = (
+            select(func.count())
+            .where(
+                Message.chat_id == chat_id,
+                Message.seq > target.seq,
+                Message.sender_id != user_id,
+            )
+            .scalar_subquery()
+        )
+        moved = db.session.execute(
+            update(chat_read_states)
+            .where(state, chat_read_states.c.last_read_seq < target.seq)
+            .values(last_read_seq=target.seq, unread_count=unread)
+            .returning(chat_read_states.c.unread_count)
+        ).first()
+
+    if moved is not None:
+        unread_count = moved.unread_count
+    else:
+        unread_count = db.session.execute(
+            select(chat_read_states.c.unread_count).where(state)
+        ).scalar()
+    db.session.commit()
+    return ReadState(
+        message_id=target.id if moved else None, unread_count=unread_count or 0
+    )
+
+
+def check_chat_exists(user1_id: str, user2_id: str) -> Optional[Chat]:
+    """
+    Check if two users have a chat, with a single lookup of their pair_key in
+    the unique index on chats.
+    """
+    low, high = pair_key(user1_id, user2_id)
+    return Chat.query.filter_by(pair_low_id=low, pair_high_id=high).first()
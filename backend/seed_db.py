@@ -1,8 +1,32 @@
+import argparse
+import io
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, update
+from werkzeug.security import generate_password_hash
+
 from app import create_app, db
-from models import Chat, Message, User, chat_participants
+from models import (
+    Chat,
+    Message,
+    User,
+    chat_participants,
+    chat_read_states,
+    message_archive_chats,
+    message_archives,
+    pair_key,
+    uuid7,
+)
+from partitions import analyze_messages, ensure_partitions
 
 
 def reset_database():
+    db.session.execute(message_archive_chats.delete())
+    db.session.execute(message_archives.delete())
+    db.session.execute(chat_read_states.delete())
     db.session.execute(chat_participants.delete())  # Clear association table first
     db.session.query(Message).delete()
     db.session.query(Chat).delete()
@@ -40,6 +64,10 @@ def create_mock_chats(users):
 
     chat1.participants.extend([users[0], users[1]])  # Anton <-> Bugge
     chat2.participants.extend([users[0], users[2]])  # Anton <-> Bergman
+    for chat in (chat1, chat2):
+        chat.pair_low_id, chat.pair_high_id = pair_key(
+            *(user.id for user in chat.participants)
+        )
 
     db.session.add_all([chat1, chat2])
     db.session.commit()
@@ -77,27 +105,294 @@ def create_mock_messages(chats, users):
     for chat in chats:
         last_message = (
             Message.query.filter_by(chat_id=chat.id)
-            .order_by(Message.timestamp.desc())
+            .order_by(Message.timestamp.desc(), Message.seq.desc())
             .first()
         )
-        chat.last_message_id = last_message.id if last_message else None
+        chat.last_message = last_message
 
     db.session.commit()
     print("Chat last message updated.")
 
 
+# Create read states, as if every participant had read each chat up to their
+# own latest message
+def create_read_states():
+    # One pass over messages with joins and GROUP BY; correlated subqueries
+    # per participant would probe every message partition for each of them
+    last_sent = (
+        select(
+            Message.chat_id,
+            Message.sender_id,
+            func.max(Message.seq).label("seq"),
+        )
+        .group_by(Message.chat_id, Message.sender_id)
+        .subquery()
+    )
+    last_read_seq = func.coalesce(last_sent.c.seq, 0)
+    db.session.execute(
+        insert(chat_read_states).from_select(
+            ["user_id", "chat_id", "last_read_seq", "unread_count"],
+            select(
+                chat_participants.c.user_id,
+                chat_participants.c.chat_id,
+                last_read_seq,
+                func.count(Message.seq),
+            )
+            .outerjoin(
+                last_sent,
+                (last_sent.c.chat_id == chat_participants.c.chat_id)
+                & (last_sent.c.sender_id == chat_participants.c.user_id),
+            )
+            .outerjoin(
+                Message,
+                (Message.chat_id == chat_participants.c.chat_id)
+                & (Message.sender_id != chat_participants.c.user_id)
+                & (Message.seq > last_read_seq),
+            )
+            .group_by(
+                chat_participants.c.user_id,
+                chat_participants.c.chat_id,
+                last_sent.c.seq,
+            ),
+        )
+    )
+    db.session.commit()
+    print("Read states created.")
+
+
 # Run the seeding process
 def seed_database():
     reset_database()
     users = create_mock_users()
     chats = create_mock_chats(users)
     create_mock_messages(chats, users)
+    create_read_states()
     print("Database seeded successfully!")
 
 
+# ---- Synthetic load data ----
+
+SYNTHETIC_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SYNTHETIC_WORDS = (
+    "hey hi hello thanks sure ok great meeting today tomorrow contract review "
+    "draft clause deadline call later lunch coffee project update send file "
+    "please agreed sounds good see you soon question answer client court"
+).split()
+
+
+class _LineStream(io.RawIOBase):
+    """
+    File-like object over an iterator of text lines, so COPY can stream rows
+    as they are generated instead of building the whole payload in memory.
+    """
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunks, size = [self._buffer], len(self._buffer)
+        for line in self._lines:
+            data = line.encode()
+            chunks.append(data)
+            size += len(data)
+            if size >= len(buffer):
+                break
+        data = b"".join(chunks)
+        n = min(len(buffer), len(data))
+        buffer[:n] = data[:n]
+        self._buffer = data[n:]
+        return n
+
+
+def bulk_load(table, columns, rows, batch_size):
+    """
+    Load an iterable of row tuples into a table.
+    Uses COPY FROM STDIN on PostgreSQL and batched executemany INSERTs on
+    other databases. Rows must not contain tabs, newlines or backslashes.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == "postgresql":
+        lines = ("\t".join(map(str, row)) + "\n" for row in rows)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN",
+                _LineStream(lines),
+                size=1 << 20,
+            )
+        return
+
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, batch_size)):
+        db.session.execute(insert(table), [dict(zip(columns, row)) for row in batch])
+
+
+def seed_synthetic(
+    users,
+    chats_per_user,
+    messages_per_chat,
+    partner_skew=1.0,
+    message_skew=1.5,
+    seed=42,
+    batch_size=10_000,
+):
+    """
+    Generate a production-sized dataset.
+
+    Every user starts `chats_per_user` two-person chats with partners drawn
+    from a Zipf distribution (`partner_skew`), so a few users are in many
+    chats. Message counts per chat follow a Pareto distribution with shape
+    `message_skew` and mean `messages_per_chat`. The same seed always
+    produces the same ids, usernames, texts and timestamps. All users have
+    the password "password123".
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    def new_id(timestamp=SYNTHETIC_START):
+        return uuid7(int(timestamp.timestamp() * 1000), rng.getrandbits(74))
+
+    reset_database()
+
+    # Hashing is deliberately slow, so every user shares one hash
+    password_hash = generate_password_hash("password123")
+    user_ids = [new_id() for _ in range(users)]
+    bulk_load(
+        User.__table__,
+        ["id", "username", "password_hash"],
+        ((user_id, f"user{i}", password_hash) for i, user_id in enumerate(user_ids)),
+        batch_size,
+    )
+    print(f"{users} users created.")
+
+    popularity = list(
+        itertools.accumulate(1 / (i + 1) ** partner_skew for i in range(users))
+    )
+    pairs = set()
+    for user in range(users):
+        for _ in range(chats_per_user):
+            for _attempt in range(10):
+                partner = rng.choices(range(users), cum_weights=popularity)[0]
+                pair = (min(user, partner), max(user, partner))
+                if partner != user and pair not in pairs:
+                    pairs.add(pair)
+                    break
+    chats = [(new_id(), pair) for pair in sorted(pairs)]
+    bulk_load(
+        Chat.__table__,
+        ["id", "created_at", "pair_low_id", "pair_high_id"],
+        (
+            (chat_id, SYNTHETIC_START.isoformat())
+            + pair_key(user_ids[pair[0]], user_ids[pair[1]])
+            for chat_id, pair in chats
+        ),
+        batch_size,
+    )
+    bulk_load(
+        chat_participants,
+        ["chat_id", "user_id"],
+        ((chat_id, user_ids[member]) for chat_id, pair in chats for member in pair),
+        batch_size,
+    )
+    print(f"{len(chats)} chats created.")
+
+    # Messages go back to SYNTHETIC_START, before the partitions created by
+    # the migration. Rows beyond the last partition land in the default one
+    # and are moved out after loading.
+    partitioned = db.session.connection().dialect.name == "postgresql"
+    if partitioned:
+        ensure_partitions(since=SYNTHETIC_START)
+
+    last_messages = {}
+    message_count = 0
+
+    def generate_messages():
+        nonlocal message_count
+        scale = messages_per_chat * (message_skew - 1) / message_skew
+        for chat_id, pair in chats:
+            count = int(scale * rng.paretovariate(message_skew))
+            timestamp = SYNTHETIC_START + timedelta(seconds=rng.randrange(86_400))
+            message_id = None
+            for _ in range(count):
+                timestamp += timedelta(seconds=rng.randrange(1, 3_600))
+                message_id = new_id(timestamp)
+                text = " ".join(rng.choices(SYNTHETIC_WORDS, k=rng.randint(1, 12)))
+                sender_id = user_ids[pair[rng.getrandbits(1)]]
+                yield message_id, chat_id, sender_id, text, timestamp.isoformat()
+            message_count += count
+            if message_id:
+                last_messages[chat_id] = (message_id, timestamp.isoformat())
+
+    bulk_load(
+        Message.__table__,
+        ["id", "chat_id", "sender_id", "text", "timestamp"],
+        generate_messages(),
+        batch_size,
+    )
+    print(f"{message_count} messages created.")
+    if partitioned:
+        ensure_partitions()
+        analyze_messages()
+
+    items = iter(last_messages.items())
+    while batch := list(itertools.islice(items, batch_size)):
+        db.session.execute(
+            update(Chat),
+            [
+                {"id": chat_id, "last_message_id": message_id, "last_message_at": at}
+                for chat_id, (message_id, at) in batch
+            ],
+        )
+    db.session.commit()
+    create_read_states()
+    print(
+        f"Synthetic database seeded in {time.perf_counter() - started:.1f}s "
+        f"(seed {seed})."
+    )
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the database.")
+    parser.add_argument(
+        "--synthetic",
+        action="store_true",
+        help="Generate load-test data instead of the mock users and chats",
+    )
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--chats-per-user", type=int, default=5)
+    parser.add_argument("--messages-per-chat", type=int, default=100)
+    parser.add_argument(
+        "--partner-skew",
+        type=float,
+        default=1.0,
+        help="Zipf exponent for how chats concentrate on popular users",
+    )
+    parser.add_argument(
+        "--message-skew",
+        type=float,
+        default=1.5,
+        help="Pareto shape for messages per chat; lower is more skewed (> 1)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
     # Initialize the Flask app
     app = create_app()
 
     with app.app_context():
-        seed_database()
+        if args.synthetic:
+            seed_synthetic(
+                users=args.users,
+                chats_per_user=args.chats_per_user,
+                messages_per_chat=args.messages_per_chat,
+                partner_skew=args.partner_skew,
+                message_skew=args.message_skew,
+                seed=args.seed,
+                batch_size=args.batch_size,
+            )
+        else:
+            seed_database()
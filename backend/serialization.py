@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
+from flask import Response
+
+from models import Chat
+
+try:
+    import orjson
+except ImportError:
+    # Optional, dumps falls back to the stdlib encoder
+    orjson = None
+
+
+def message_dict(row, **extra) -> dict:
+    """
+    Build a MessageResponse-shaped dict from a message row with id, chat_id,
+    sender, text and timestamp attributes, such as the projections returned
+    by get_messages_by_chat_id. Extra fields are added as given.
+    """
+    return {
+        "messageId": row.id,
+        "chatId": row.chat_id,
+        "sender": row.sender,
+        "text": row.text,
+        "timestamp": row.timestamp,
+        **extra,
+    }
+
+
+def chat_summary_dict(chat: Chat, unread_count: int) -> dict:
+    """
+    Build a ChatResponse-shaped dict for a chat loaded by
+    get_chat_summaries_by_user_id.
+    """
+    last_message = chat.last_message
+    return {
+        "chatId": chat.id,
+        "participants": [p.username for p in chat.participants],
+        "lastMessage": {
+            "sender": last_message.sender.username,
+            "text": last_message.text,
+            "timestamp": last_message.timestamp,
+        }
+        if last_message
+        else None,
+        "unreadCount": unread_count,
+    }
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload: Any) -> bytes:
+    """
+    Encode a payload of plain dicts, lists and scalars as JSON, with datetimes
+    as ISO 8601 strings. Uses orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode()
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Build a JSON response from a payload without going through pydantic."""
+    return Response(dumps(payload), status=status, mimetype="application/json")
+
+
+EXPORT_CSV_COLUMNS = ("messageId", "chatId", "sender", "text", "timestamp")
+
+
+def _batches(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def ndjson_chunks(rows: Iterable, batch_size: int = 1000) -> Iterator[bytes]:
+    """
+    Encode message rows as newline-delimited JSON, one MessageResponse-shaped
+    object per line, yielding one chunk per `batch_size` rows.
+    """
+    for batch in _batches(rows, batch_size):
+        yield b"".join(dumps(message_dict(row)) + b"\n" for row in batch)
+
+
+def csv_chunks(rows: Iterable, batch_size: int = 1000) -> Iterator[bytes]:
+    """
+    Encode message rows as CSV with a header line, yielding one chunk per
+    `batch_size` rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    for batch in _batches(rows, batch_size):
+        writer.writerows(
+            (row.id, row.chat_id, row.sender, row.text, row.timestamp.isoformat())
+            for row in batch
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty export
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a stream of chunks into a gzip stream as they are produced."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,49 @@
+"""
+Production entry point for the backend.
+
+Runs the Socket.IO server on gevent, with the standard library and psycopg2
+patched for cooperative I/O so one process can hold thousands of idle
+WebSocket connections. The Werkzeug reloader and debugger are not used.
+
+    python serve.py --host 0.0.0.0 --port 5000
+
+Use `python app.py` for local development instead.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+from psycogreen.gevent import patch_psycopg  # noqa: E402
+
+patch_psycopg()
+
+import argparse  # noqa: E402
+import os  # noqa: E402
+
+os.environ["SOCKETIO_ASYNC_MODE"] = "gevent"
+
+from app import app, socketio  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the production server.")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    parser.add_argument(
+        "--access-log", action="store_true", help="Log every HTTP request"
+    )
+    args = parser.parse_args()
+
+    socketio.run(
+        app,
+        host=args.host,
+        port=args.port,
+        debug=False,
+        use_reloader=False,
+        log_output=args.access_log,
+    )
+
+
+if __name__ == "__main__":
+    main()
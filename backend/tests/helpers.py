@@ -0,0 +1,16 @@
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+
+from models import User
+
+
+def create_users(database, usernames):
+    # Hashing passwords is deliberately slow and never checked here
+    return database.session.scalars(
+        insert(User).returning(User),
+        [{"username": username, "password_hash": "unused"} for username in usernames],
+    ).all()
+
+
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token(identity=user.id)}"}
@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import event, insert, update
+
+import partitions
+import queries
+from helpers import auth_headers, create_users
+from models import Chat, Message, generate_uuid
+
+
+def start_chats(database, user, count):
+    """Start `count` chats between `user` and new partners, one message each."""
+    partners = create_users(
+        database, [f"{user.username}-partner{i}" for i in range(count)]
+    )
+    database.session.commit()
+    for partner in partners:
+        chat = queries.create_chat([user, partner])
+        queries.create_message(chat.id, partner.id, f"Hi {user.username}")
+
+
+def count_chat_list_statements(database, client, user):
+    """GET /api/chats as `user`; returns the chat count and SQL statement count."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/api/chats", headers=auth_headers(user))
+    finally:
+        event.remove(database.engine, "before_cursor_execute", count)
+    assert response.status_code == 200
+    return len(response.json), len(statements)
+
+
+def test_chat_list_statement_count_does_not_grow_with_chats(database, client):
+    one, many = create_users(database, ["one", "many"])
+    database.session.commit()
+    start_chats(database, one, 1)
+    start_chats(database, many, 25)
+
+    one_chats, one_statements = count_chat_list_statements(database, client, one)
+    many_chats, many_statements = count_chat_list_statements(database, client, many)
+
+    assert (one_chats, many_chats) == (1, 25)
+    assert many_statements == one_statements
+
+
+def test_chat_list_shows_last_messages_from_every_month(database, client):
+    alice, bob, carol = create_users(database, ["alice", "bob", "carol"])
+    database.session.commit()
+    recent = queries.create_chat([alice, bob])
+    queries.create_message(recent.id, bob.id, "recent")
+    old = queries.create_chat([alice, carol])
+    old_month = partitions.add_months(
+        partitions.month_start(datetime.now(timezone.utc)), -2
+    )
+    partitions.ensure_partitions(since=old_month)
+    message_id = generate_uuid()
+    database.session.execute(
+        insert(Message).values(
+            id=message_id,
+            chat_id=old.id,
+            sender_id=carol.id,
+            text="old",
+            timestamp=old_month,
+        )
+    )
+    database.session.execute(
+        update(Chat)
+        .where(Chat.id == old.id)
+        .values(last_message_id=message_id, last_message_at=old_month)
+    )
+    database.session.commit()
+
+    response = client.get("/api/chats", headers=auth_headers(alice))
+
+    assert response.status_code == 200
+    assert {
+        chat["chatId"]: (chat["lastMessage"]["sender"], chat["lastMessage"]["text"])
+        for chat in response.json
+    } == {recent.id: ("bob", "recent"), old.id: ("carol", "old")}
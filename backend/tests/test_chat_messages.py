@@ -0,0 +1,93 @@
+import base64
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+import queries
+from helpers import auth_headers, create_users
+from models import Chat
+
+
+def cursor(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "direction, timestamp", [("after", "2000-01-01"), ("before", "2999-01-01")]
+)
+def test_naive_cursor_is_read_as_utc(database, client, direction, timestamp):
+    alice, bob = create_users(database, ["alice", "bob"])
+    database.session.commit()
+    chat = queries.create_chat([alice, bob])
+    for text in ("one", "two", "three"):
+        queries.create_message(chat.id, alice.id, text)
+
+    naive, aware = [
+        client.get(
+            f"/api/chats/{chat.id}",
+            query_string={direction: cursor(f"{timestamp}T00:00:00{offset}|0")},
+            headers=auth_headers(alice),
+        )
+        for offset in ("", "+00:00")
+    ]
+
+    assert naive.status_code == 200
+    assert naive.json == aware.json
+    texts = [message["text"] for message in naive.json["messages"]]
+    assert texts == ["one", "two", "three"]
+
+
+@pytest.mark.parametrize(
+    "query_string", [{}, {"after": cursor("2000-01-01T00:00:00+00:00|0")}]
+)
+def test_history_includes_messages_older_than_the_chat(database, client, query_string):
+    # Chats created before created_at had a server default were stamped at
+    # app start, which can be later than their messages
+    alice, bob = create_users(database, ["alice", "bob"])
+    database.session.commit()
+    chat = queries.create_chat([alice, bob])
+    for text in ("one", "two"):
+        queries.create_message(chat.id, alice.id, text)
+    later = datetime.now(timezone.utc) + timedelta(days=60)
+    database.session.execute(
+        update(Chat).where(Chat.id == chat.id).values(created_at=later)
+    )
+    database.session.commit()
+
+    response = client.get(
+        f"/api/chats/{chat.id}",
+        query_string=query_string,
+        headers=auth_headers(alice),
+    )
+
+    assert response.status_code == 200
+    assert [message["text"] for message in response.json["messages"]] == [
+        "one",
+        "two",
+    ]
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_older_message_does_not_replace_a_newer_last_message(database, batch):
+    # A send whose transaction started before the chat's last message was
+    # stamped commits after it
+    alice, bob = create_users(database, ["alice", "bob"])
+    database.session.commit()
+    chat = queries.create_chat([alice, bob])
+    newer = queries.create_message(chat.id, bob.id, "newer")
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+    database.session.execute(
+        update(Chat).where(Chat.id == chat.id).values(last_message_at=later)
+    )
+    database.session.commit()
+
+    if batch:
+        queries.create_messages(alice.id, [(chat.id, "older")])
+    else:
+        queries.create_message(chat.id, alice.id, "older")
+
+    last = database.session.execute(
+        select(Chat.last_message_id, Chat.last_message_at).where(Chat.id == chat.id)
+    ).one()
+    assert last == (newer.id, later)
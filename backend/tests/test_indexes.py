@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import event, select, text
+
+import queries
+from models import Message, User
+from seed_db import seed_synthetic
+
+USERS = 500
+
+
+@pytest.fixture
+def seeded(database):
+    """A synthetic dataset large enough for the planner to prefer indexes."""
+    seed_synthetic(users=USERS, chats_per_user=5, messages_per_chat=40, seed=7)
+    database.session.execute(text("ANALYZE"))
+    database.session.commit()
+    # Partners are drawn from a Zipf distribution, so the last user is in
+    # few chats and sent few messages
+    return database.session.scalar(
+        select(User).where(User.username == f"user{USERS - 1}")
+    )
+
+
+def first_statement(database, run, table=None):
+    """Run `run` and return the first SQL statement it executes, or the first
+    reading `table`, with its parameters."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if table is None or f"FROM {table}" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(database.engine, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(database.engine, "before_cursor_execute", capture)
+    return statements[0]
+
+
+def plan_indexes(database, statement, parameters):
+    """Names of the indexes scanned by the plan for `statement`."""
+    plan = (
+        database.session.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        .scalar()
+    )
+    indexes = set()
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Index Name" in node:
+            indexes.add(node["Index Name"])
+        nodes.extend(node.get("Plans", []))
+    return indexes
+
+
+def index_and_partitions(database, index):
+    """`index` and, on a partitioned table, the partitions' copies of it."""
+    return {index} | set(
+        database.session.scalars(
+            text("SELECT relid::regclass::text FROM pg_partition_tree(:index)"),
+            {"index": index},
+        )
+    )
+
+
+def test_hot_queries_use_indexes(database, seeded):
+    chat_id = queries.get_chat_summaries_by_user_id(seeded.id)[0][0].id
+    history = first_statement(
+        database,
+        lambda: queries.get_messages_by_chat_id(chat_id),
+        table="messages",
+    )
+    chat_list = first_statement(
+        database, lambda: queries.get_chat_summaries_by_user_id(seeded.id)
+    )
+    sender = first_statement(
+        database,
+        lambda: database.session.execute(
+            select(Message.id).where(Message.sender_id == seeded.id)
+        ).all(),
+    )
+
+    assert plan_indexes(database, *history) & index_and_partitions(
+        database, "ix_messages_chat_id_timestamp_seq"
+    )
+    assert "ix_chat_participants_user_id_chat_id" in plan_indexes(database, *chat_list)
+    assert plan_indexes(database, *sender) & index_and_partitions(
+        database, "ix_messages_sender_id"
+    )
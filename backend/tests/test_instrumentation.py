@@ -0,0 +1,90 @@
+import pytest
+from flask import Flask, jsonify
+from flask_socketio import SocketIO
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from db import db
+from instrumentation import Instrumentation
+
+
+@pytest.fixture
+def instrumented(tmp_path):
+    """An instrumented app on SQLite with an endpoint answering any status,
+    one running a failing statement, and a Socket.IO event acking with an
+    error."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'app.db'}"
+    app.config["INSTRUMENTATION_ENABLED"] = True
+    app.config["INSTRUMENTATION_METRICS_TOKEN"] = "secret"
+    db.init_app(app)
+    instrumentation = Instrumentation(app)
+    socketio = SocketIO(app, async_mode="threading")
+
+    @app.route("/status/<int:status>")
+    def answer(status):
+        return jsonify({}), status
+
+    @app.route("/failing-statement")
+    def failing_statement():
+        try:
+            db.session.execute(text("SELECT * FROM missing"))
+        except OperationalError:
+            db.session.rollback()
+        db.session.execute(text("SELECT 1"))
+        return jsonify({})
+
+    @socketio.on("fail")
+    @instrumentation.socket_event
+    def fail(data):
+        return {"error": "Failed"}
+
+    return app, socketio
+
+
+def metrics(app, token="secret"):
+    response = app.test_client().get(
+        "/metrics", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    return response.text.splitlines()
+
+
+def test_errors_are_counted_from_response_status(instrumented):
+    app, _ = instrumented
+    client = app.test_client()
+    for status in (200, 404, 500, 503):
+        client.get(f"/status/{status}")
+
+    lines = metrics(app)
+
+    labels = 'transport="http",endpoint="answer"'
+    assert f"legora_requests_total{{{labels}}} 4" in lines
+    assert f"legora_request_errors_total{{{labels}}} 2" in lines
+    assert f"legora_request_client_errors_total{{{labels}}} 1" in lines
+
+
+def test_failing_statements_are_counted(instrumented):
+    app, _ = instrumented
+    client = app.test_client()
+    for _ in range(2):
+        client.get("/failing-statement")
+
+    labels = 'transport="http",endpoint="failing_statement"'
+    assert f"legora_db_statements_total{{{labels}}} 4" in metrics(app)
+
+
+def test_socket_error_acks_are_counted_as_errors(instrumented):
+    app, socketio = instrumented
+    client = socketio.test_client(app)
+
+    assert client.emit("fail", {}, callback=True) == {"error": "Failed"}
+
+    labels = 'transport="socketio",endpoint="fail"'
+    assert f"legora_request_errors_total{{{labels}}} 1" in metrics(app)
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}])
+def test_metrics_require_the_token(instrumented, headers):
+    app, _ = instrumented
+    assert app.test_client().get("/metrics", headers=headers).status_code == 401
@@ -0,0 +1,126 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, update
+
+import partitions
+import queries
+from conftest import BACKEND_DIR
+from helpers import auth_headers, create_users
+from models import Chat, Message, generate_uuid
+
+EXPECTED = ["old 0", "old 1", "old 2", "new 0", "new 1"]
+
+
+@pytest.fixture
+def old_chat(app, database, monkeypatch, tmp_path):
+    """
+    A chat with three messages in a month old enough to archive to tmp_path,
+    and two from now. Returns the chat, a participant and the old month.
+    """
+    monkeypatch.setitem(app.config, "MESSAGE_ARCHIVE_DIR", str(tmp_path))
+    old_month = partitions.add_months(
+        partitions.month_start(datetime.now(timezone.utc)), -14
+    )
+    partitions.ensure_partitions(since=old_month)
+    alice, bob = create_users(database, ["alice", "bob"])
+    database.session.commit()
+    chat = queries.create_chat([alice, bob])
+    database.session.execute(
+        update(Chat).where(Chat.id == chat.id).values(created_at=old_month)
+    )
+    database.session.execute(
+        insert(Message),
+        [
+            {
+                "id": generate_uuid(),
+                "chat_id": chat.id,
+                "sender_id": alice.id,
+                "text": f"old {i}",
+                "timestamp": old_month + timedelta(days=i),
+            }
+            for i in range(3)
+        ],
+    )
+    database.session.commit()
+    for i in range(2):
+        queries.create_message(chat.id, bob.id, f"new {i}")
+    return chat, alice, old_month
+
+
+def history(client, user, chat_id):
+    """Page the whole history of a chat backwards, two messages at a time."""
+    texts, before = [], None
+    while True:
+        response = client.get(
+            f"/api/chats/{chat_id}",
+            query_string={"limit": 2, **({"before": before} if before else {})},
+            headers=auth_headers(user),
+        )
+        assert response.status_code == 200
+        texts = [message["text"] for message in response.json["messages"]] + texts
+        before = response.json["nextCursor"]
+        if not before:
+            return texts
+
+
+def export(client, user, chat_id, **params):
+    response = client.get(
+        f"/api/chats/{chat_id}/export",
+        query_string=params,
+        headers=auth_headers(user),
+    )
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.data.splitlines()]
+
+
+def test_history_pages_into_months_archived_by_another_process(
+    database, client, old_chat, tmp_path
+):
+    chat, alice, old_month = old_chat
+    assert history(client, alice, chat.id) == EXPECTED
+    # Archiving waits for the locks the open transaction holds on messages
+    database.session.commit()
+
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "app", "partitions", "archive"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "MESSAGE_ARCHIVE_DIR": str(tmp_path)},
+        check=True,
+        capture_output=True,
+        timeout=60,
+    )
+
+    assert partitions.partition_name(old_month) not in {
+        partitions.partition_name(month) for month in partitions.list_partitions()
+    }
+    assert history(client, alice, chat.id) == EXPECTED
+
+
+def test_export_includes_archived_months(client, old_chat, tmp_path):
+    chat, alice, _ = old_chat
+    partitions.archive_partitions(12, str(tmp_path))
+
+    messages = export(client, alice, chat.id)
+
+    assert [message["text"] for message in messages] == EXPECTED
+    assert [message["sender"] for message in messages] == ["alice"] * 3 + ["bob"] * 2
+
+
+def test_export_range_reads_only_the_archived_messages_in_it(
+    client, old_chat, tmp_path
+):
+    chat, alice, old_month = old_chat
+    partitions.archive_partitions(12, str(tmp_path))
+    start = old_month + timedelta(days=1)
+    end = old_month + timedelta(days=2)
+
+    messages = export(
+        client, alice, chat.id, start=start.isoformat(), end=end.isoformat()
+    )
+
+    assert [message["text"] for message in messages] == ["old 1"]
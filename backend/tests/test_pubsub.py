@@ -0,0 +1,60 @@
+import queue
+
+from flask import Flask
+from flask_socketio import SocketIO
+from socketio.packet import Packet
+
+from pubsub import message_queue_options
+
+
+def create_server(url):
+    """A Flask app and Socket.IO server on the message queue at `url`."""
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading", **message_queue_options(url))
+    return app, socketio
+
+
+def join(socketio, room) -> queue.Queue:
+    """
+    Connect a client to `room` of the server, returning a queue of the names
+    of the events it is sent.
+    Flask-SocketIO's test client refuses servers with a message queue, so the
+    client is registered with the server's client manager directly.
+    """
+    server = socketio.server
+    server.manager_initialized = True
+    server.manager.initialize()
+    sid = server.manager.connect("client", "/")
+    server.manager.enter_room(sid, "/", room)
+
+    events = queue.Queue()
+    server._send_eio_packet = lambda eio_sid, eio_packet: events.put(
+        Packet(encoded_packet=eio_packet.data).data[0]
+    )
+    return events
+
+
+def test_emit_reaches_clients_of_other_servers_on_the_queue():
+    sender_app, sender = create_server("memory://shared")
+    _, receiver = create_server("memory://shared")
+    events = join(receiver, "chat")
+
+    with sender_app.app_context():
+        sender.emit("new_message", {"text": "hi"}, to="chat")
+
+    assert events.get(timeout=2) == "new_message"
+
+
+def test_queues_with_different_names_are_isolated():
+    sender_app, sender = create_server("memory://a")
+    _, receiver = create_server("memory://b")
+    events = join(receiver, "chat")
+
+    with sender_app.app_context():
+        sender.emit("new_message", {"text": "hi"}, to="chat")
+
+    try:
+        event = events.get(timeout=0.2)
+    except queue.Empty:
+        event = None
+    assert event is None
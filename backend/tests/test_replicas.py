@@ -0,0 +1,123 @@
+import os
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    func,
+    insert,
+    select,
+)
+
+from db import ReplicaRouter, db, read_only
+
+STICKY_SECONDS = 0.5
+
+metadata = MetaData()
+# Which database a statement ran on, and writes to count per database
+servers = Table("servers", metadata, Column("name", String, primary_key=True))
+writes = Table("writes", metadata, Column("id", Integer, primary_key=True))
+
+
+@read_only
+def read_server():
+    return db.session.execute(servers.select()).scalar()
+
+
+def write():
+    db.session.execute(insert(writes))
+    db.session.commit()
+
+
+@pytest.fixture(
+    params=[
+        "memory",
+        pytest.param(
+            "redis",
+            marks=pytest.mark.skipif(
+                not os.environ.get("TEST_REDIS_URL"), reason="TEST_REDIS_URL is not set"
+            ),
+        ),
+    ]
+)
+def replicated(request, tmp_path, monkeypatch):
+    """An app context with a SQLite primary and replica, named in `servers`."""
+    urls = {}
+    for name in ("primary", "replica"):
+        urls[name] = f"sqlite:///{tmp_path / name}.db"
+        engine = create_engine(urls[name])
+        with engine.begin() as connection:
+            metadata.create_all(connection)
+            connection.execute(insert(servers).values(name=name))
+        engine.dispose()
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = urls["primary"]
+    app.config["SQLALCHEMY_BINDS"] = {"replica_0": urls["replica"]}
+    app.config["DATABASE_REPLICA_STICKY_SECONDS"] = STICKY_SECONDS
+    if request.param == "redis":
+        app.config["DATABASE_REPLICA_STICKY_URL"] = os.environ["TEST_REDIS_URL"]
+    router = ReplicaRouter()
+    monkeypatch.setattr("db.router", router)
+    db.init_app(app)
+    router.init_app(app)
+
+    with app.app_context():
+        yield
+        db.session.remove()
+        if router.redis is not None:
+            router.redis.delete(*(router.key_prefix + user for user in ("a", "b")))
+
+
+def new_session(user_id):
+    """Start a new request's session for `user_id`."""
+    db.session.remove()
+    db.session.info["user_id"] = user_id
+
+
+def write_counts():
+    counts = {}
+    for key in (None, "replica_0"):
+        with db.engines[key].connect() as connection:
+            counts[key] = connection.scalar(select(func.count()).select_from(writes))
+    return counts
+
+
+def test_read_only_reads_go_to_replica(replicated):
+    new_session("a")
+    assert read_server() == "replica"
+
+
+def test_reads_outside_read_only_go_to_primary(replicated):
+    new_session("a")
+    assert db.session.execute(servers.select()).scalar() == "primary"
+
+
+def test_writes_go_to_primary(replicated):
+    new_session("a")
+    read_only(write)()
+    write()
+
+    assert write_counts() == {None: 2, "replica_0": 0}
+
+
+def test_reads_after_a_write_go_to_primary_while_sticky(replicated):
+    new_session("a")
+    assert read_server() == "replica"
+    write()
+    assert read_server() == "primary"
+
+    new_session("a")
+    assert read_server() == "primary"
+    new_session("b")
+    assert read_server() == "replica"
+
+    time.sleep(STICKY_SECONDS)
+    new_session("a")
+    assert read_server() == "replica"
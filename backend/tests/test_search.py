@@ -0,0 +1,57 @@
+import queries
+from helpers import auth_headers, create_users
+
+
+def search(client, user, **params):
+    return client.get("/api/search", query_string=params, headers=auth_headers(user))
+
+
+def texts(response):
+    assert response.status_code == 200
+    return [result["text"] for result in response.json["results"]]
+
+
+def start_chat(database, *usernames):
+    users = create_users(database, usernames)
+    database.session.commit()
+    return queries.create_chat(users), users
+
+
+def test_search_ranks_better_matches_first(database, client):
+    chat, (alice, bob) = start_chat(database, "alice", "bob")
+    for text in ("apple pie, apple tart, apple crumble", "an apple", "a pear"):
+        queries.create_message(chat.id, bob.id, text)
+
+    assert texts(search(client, alice, q="apple")) == [
+        "apple pie, apple tart, apple crumble",
+        "an apple",
+    ]
+
+
+def test_search_only_covers_the_users_chats(database, client):
+    chat, (alice, bob) = start_chat(database, "alice", "bob")
+    other_chat, (carol, _) = start_chat(database, "carol", "dave")
+    queries.create_message(chat.id, bob.id, "apple")
+    queries.create_message(other_chat.id, carol.id, "apple for carol")
+    third_chat = queries.create_chat([alice, carol])
+    queries.create_message(third_chat.id, carol.id, "apple for alice")
+
+    assert sorted(texts(search(client, alice, q="apple"))) == [
+        "apple",
+        "apple for alice",
+    ]
+    assert texts(search(client, alice, q="apple", chat_id=chat.id)) == ["apple"]
+    assert search(client, alice, q="apple", chat_id=other_chat.id).status_code == 404
+
+
+def test_search_pages_with_next_offset(database, client):
+    chat, (alice, bob) = start_chat(database, "alice", "bob")
+    for i in range(3):
+        queries.create_message(chat.id, bob.id, f"apple {i}")
+
+    first = search(client, alice, q="apple", limit=2)
+    second = search(client, alice, q="apple", limit=2, offset=first.json["nextOffset"])
+
+    assert first.json["nextOffset"] == 2
+    assert second.json["nextOffset"] is None
+    assert sorted(texts(first) + texts(second)) == ["apple 0", "apple 1", "apple 2"]
@@ -0,0 +1,26 @@
+from typing import List
+
+import pytest
+from flask import Response
+
+from app import ChatResponse, app, respond
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_respond_returns_a_response_with_status(monkeypatch, fast):
+    endpoints = {"get_user_chats"} if fast else set()
+    monkeypatch.setitem(app.config, "FAST_SERIALIZATION_ENDPOINTS", endpoints)
+    chat = {
+        "chatId": "c1",
+        "participants": ["alice", "bob"],
+        "lastMessage": None,
+        "unreadCount": 0,
+    }
+
+    with app.test_request_context("/api/chats"):
+        response = respond(List[ChatResponse], [chat], 201)
+
+    assert isinstance(response, Response)
+    assert response.status_code == 201
+    assert response.mimetype == "application/json"
+    assert response.json == [chat]
@@ -0,0 +1,27 @@
+import time
+
+from flask_jwt_extended import create_access_token
+
+import queries
+from app import socket_sessions, socketio
+from helpers import create_users
+
+
+def test_expired_socket_is_disconnected(app, database):
+    alice, bob = create_users(database, ["alice", "bob"])
+    database.session.commit()
+    chat = queries.create_chat([alice, bob])
+    with app.app_context():
+        token = create_access_token(identity=alice.id)
+    client = socketio.test_client(app, query_string=f"token={token}")
+    client.emit("join_chat", {"chatId": chat.id, "participants": []})
+    client.get_received()
+    for session in socket_sessions.values():
+        session.expires_at = time.time()
+
+    ack = client.emit("send_message", {"chat_id": chat.id, "text": "hi"}, callback=True)
+
+    assert ack == {"error": "Authentication token expired"}
+    assert not client.is_connected()
+    # Left its rooms, so broadcasts to the chat no longer reach it
+    assert not list(socketio.server.manager.get_participants("/", chat.id))
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import insert
+
+import queries
+from helpers import auth_headers, create_users
+from models import Message, generate_uuid
+
+
+@pytest.fixture
+def chat(database):
+    alice, bob = create_users(database, ["alice", "bob"])
+    database.session.commit()
+    return queries.create_chat([alice, bob]), alice, bob
+
+
+@pytest.fixture
+def grace(app):
+    """Set SYNC_GRACE_SECONDS for the test."""
+    default = app.config["SYNC_GRACE_SECONDS"]
+
+    def set_grace(seconds):
+        app.config["SYNC_GRACE_SECONDS"] = seconds
+
+    yield set_grace
+    app.config["SYNC_GRACE_SECONDS"] = default
+
+
+def sync(client, user, token=None):
+    response = client.get(
+        "/api/sync",
+        query_string={"since": token} if token else {},
+        headers=auth_headers(user),
+    )
+    assert response.status_code == 200
+    return response.json
+
+
+def sync_all(client, user, token):
+    """Sync until hasMore is unset; returns the message texts and the token."""
+    texts = []
+    while True:
+        changes = sync(client, user, token)
+        texts += [message["text"] for message in changes["messages"]]
+        token = changes["syncToken"]
+        if not changes["hasMore"]:
+            return texts, token
+
+
+def send(chat, sender, *texts):
+    for text in texts:
+        queries.create_message(chat.id, sender.id, text)
+
+
+def test_sync_returns_messages_since_the_token(client, chat, grace):
+    chat, alice, bob = chat
+    grace(0)
+    send(chat, alice, "before")
+    token = sync(client, bob)["syncToken"]
+    send(chat, alice, "one", "two")
+
+    texts, token = sync_all(client, bob, token)
+
+    assert texts == ["one", "two"]
+    assert sync_all(client, bob, token)[0] == []
+
+
+def test_sync_pages_with_has_more(client, chat, grace, monkeypatch):
+    chat, alice, bob = chat
+    grace(0)
+    monkeypatch.setattr(queries, "MAX_SYNC_MESSAGES", 2)
+    token = sync(client, bob)["syncToken"]
+    send(chat, alice, "1", "2", "3", "4", "5")
+
+    pages = []
+    while True:
+        changes = sync(client, bob, token)
+        pages.append(([m["text"] for m in changes["messages"]], changes["hasMore"]))
+        token = changes["syncToken"]
+        if not changes["hasMore"]:
+            break
+
+    assert pages == [(["1", "2"], True), (["3", "4"], True), (["5"], False)]
+    assert sync_all(client, bob, token)[0] == []
+
+
+def test_sync_repeats_messages_within_the_grace_period(client, chat, grace):
+    chat, alice, bob = chat
+    grace(60)
+    token = sync(client, bob)["syncToken"]
+    send(chat, alice, "one")
+
+    first, token = sync_all(client, bob, token)
+    second, token = sync_all(client, bob, token)
+
+    assert first == second == ["one"]
+
+
+def test_sync_returns_late_commits_of_lower_seqs(
+    database, client, chat, grace, monkeypatch
+):
+    chat, alice, bob = chat
+    grace(60)
+    monkeypatch.setattr(queries, "MAX_SYNC_MESSAGES", 1)
+    token = sync(client, bob)["syncToken"]
+
+    # Takes a seq below the messages sent next, but commits after they are
+    # synced
+    with database.engine.connect() as connection:
+        transaction = connection.begin()
+        connection.execute(
+            insert(Message).values(
+                id=generate_uuid(), chat_id=chat.id, sender_id=alice.id, text="late"
+            )
+        )
+        send(chat, alice, "one", "two")
+        texts, token = sync_all(client, bob, token)
+        assert texts == ["one", "two"]
+        transaction.commit()
+
+    texts, token = sync_all(client, bob, token)
+
+    assert "late" in texts
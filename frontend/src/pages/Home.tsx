@@ -1,10 +1,13 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
 import { useAuth } from "../context/AuthContext";
 import {
   ChatResponse,
   MessageResponse,
   ChatMessageResponse,
+  SendMessageAck,
+  ReadStateResponse,
+  SyncResponse,
 } from "../types/types";
 import axios from "axios";
 import { Socket } from "socket.io-client";
@@ -17,6 +20,11 @@ function Home() {
   const [chats, setChats] = useState<ChatResponse[]>([]);
   const [selectedChat, setSelectedChat] = useState<ChatResponse | null>(null);
   const [messages, setMessages] = useState<MessageResponse[]>([]);
+  // Cursor of the oldest loaded page, null once the whole history is loaded
+  const [olderCursor, setOlderCursor] = useState<string | null>(null);
+  // Position to catch up from after the socket reconnects
+  const syncToken = useRef<string | null>(null);
+  const selectedChatId = useRef<string | null>(null);
 
   const handleLogout = (): void => {
     logout();
@@ -38,6 +46,19 @@ function Home() {
     }
   };
 
+  const fetchSyncToken = async (token: string): Promise<void> => {
+    try {
+      const response = await axios.get("http://127.0.0.1:5000/api/sync", {
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      });
+      syncToken.current = (response.data as SyncResponse).syncToken;
+    } catch (error) {
+      console.error("Error fetching sync token:", error);
+    }
+  };
+
   const fetchChatMessages = async (
     chat: ChatResponse,
     token: string,
@@ -55,20 +76,77 @@ function Home() {
       const chatMessageResponse = response.data as ChatMessageResponse;
       const messageList = chatMessageResponse.messages;
       setMessages(messageList);
+      setOlderCursor(chatMessageResponse.nextCursor ?? null);
       socket.emit("join_chat", chat);
+      markRead(socket, chat.chatId);
     } catch (error) {
       console.error("Error fetching chat messages:", error);
       throw error;
     }
   };
 
+  // Moves the read position up to `messageId`, or the chat's last message,
+  // and shows the unread count the server answers with
+  const markRead = (
+    socket: Socket,
+    chatId: string,
+    messageId?: string
+  ): void => {
+    socket.emit(
+      "mark_read",
+      { chat_id: chatId, message_id: messageId },
+      (readState: ReadStateResponse) => {
+        setChats((prevChats) =>
+          prevChats.map((c) =>
+            c.chatId === readState.chatId
+              ? { ...c, unreadCount: readState.unreadCount }
+              : c
+          )
+        );
+      }
+    );
+  };
+
+  const fetchOlderMessages = async (): Promise<void> => {
+    if (!selectedChat || !olderCursor || !token) return;
+    const chatId = selectedChat.chatId;
+    try {
+      const response = await axios.get(
+        `http://127.0.0.1:5000/api/chats/${chatId}`,
+        {
+          params: { before: olderCursor },
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        }
+      );
+      // Another chat may have been opened while the page loaded
+      if (selectedChatId.current !== chatId) return;
+      const chatMessageResponse = response.data as ChatMessageResponse;
+      setMessages((prevMessages) => {
+        const seen = new Set(prevMessages.map((m) => m.messageId));
+        const older = chatMessageResponse.messages.filter(
+          (m) => !seen.has(m.messageId)
+        );
+        return [...older, ...prevMessages];
+      });
+      setOlderCursor(chatMessageResponse.nextCursor ?? null);
+    } catch (error) {
+      console.error("Error fetching older messages:", error);
+    }
+  };
+
   useEffect(() => {
     if (token) {
-      fetchUserChats(token);
+      // Take the sync position first so nothing between it and the chat
+      // list is missed on reconnect
+      fetchSyncToken(token).then(() => fetchUserChats(token));
     }
   }, [token, socket]);
 
   useEffect(() => {
+    selectedChatId.current = selectedChat?.chatId ?? null;
+    setOlderCursor(null);
     if (selectedChat && token && socket) {
       fetchChatMessages(selectedChat, token, socket);
     }
@@ -81,10 +159,90 @@ function Home() {
       setChats((prevChats) => [newChat, ...prevChats]);
     });
 
-    socket.on("new_message", (message) => {
-      setMessages((prevMessages) => [...prevMessages, message]);
+    // The socket stays in the rooms of every chat opened before, so messages
+    // may be for a chat other than the open one. Messages shown in the open
+    // chat are marked read; others count as unread in the sidebar.
+    const receiveMessages = (
+      chatId: string,
+      received: MessageResponse[]
+    ): void => {
+      const last = received[received.length - 1];
+      const isOpen = chatId === selectedChatId.current;
+      if (isOpen) {
+        setMessages((prevMessages) => [...prevMessages, ...received]);
+        if (last.sender !== user) {
+          markRead(socket, chatId, last.messageId);
+        }
+      }
+      const unread = isOpen
+        ? 0
+        : received.filter((m) => m.sender !== user).length;
+      setChats((prevChats) =>
+        prevChats.map((c) =>
+          c.chatId === chatId
+            ? {
+                ...c,
+                unreadCount: (c.unreadCount ?? 0) + unread,
+                lastMessage: {
+                  sender: last.sender,
+                  text: last.text,
+                  timestamp: last.timestamp,
+                },
+              }
+            : c
+        )
+      );
+    };
+
+    socket.on("new_message", (message: MessageResponse) => {
+      receiveMessages(message.chatId, [message]);
+    });
+
+    socket.on("new_messages", (batch: ChatMessageResponse) => {
+      receiveMessages(batch.chatId, batch.messages);
     });
 
+    socket.io.on("reconnect_attempt", () => {
+      socket.io.opts.query = {
+        ...socket.io.opts.query,
+        sync_token: syncToken.current ?? "",
+      };
+    });
+
+    const handleSync = (changes: SyncResponse): void => {
+      syncToken.current = changes.syncToken;
+      // Recent messages and chats can be sent again by the next sync
+      setChats((prevChats) => {
+        const known = new Set(prevChats.map((c) => c.chatId));
+        const created = changes.chats.filter((c) => !known.has(c.chatId));
+        return [...created, ...prevChats];
+      });
+      setMessages((prevMessages) => {
+        const seen = new Set(prevMessages.map((m) => m.messageId));
+        const missed = changes.messages.filter(
+          (m) => m.chatId === selectedChatId.current && !seen.has(m.messageId)
+        );
+        return [...prevMessages, ...missed];
+      });
+      // Rooms are per connection, so rejoin the open chat
+      if (selectedChatId.current) {
+        socket.emit("join_chat", {
+          chatId: selectedChatId.current,
+          participants: [],
+        });
+      }
+      if (changes.hasMore && token) {
+        axios
+          .get("http://127.0.0.1:5000/api/sync", {
+            params: { since: changes.syncToken },
+            headers: { Authorization: `Bearer ${token}` },
+          })
+          .then((response) => handleSync(response.data as SyncResponse))
+          .catch((error) => console.error("Error syncing:", error));
+      }
+    };
+    socket.on("sync", handleSync);
+
     socket.on("join_chat", (chat) => {
       setChats((prevChats) => [chat, ...prevChats]);
     });
@@ -96,10 +254,13 @@ function Home() {
     return () => {
       socket.off("new_chat");
       socket.off("new_message");
+      socket.off("new_messages");
+      socket.off("sync");
+      socket.io.off("reconnect_attempt");
       socket.off("join_chat");
       socket.off("error");
     };
-  }, [socket]);
+  }, [socket, token, user]);
 
   const handleChatClick = (chat: ChatResponse): void => {
     if (selectedChat?.chatId === chat?.chatId) {
@@ -112,25 +273,22 @@ function Home() {
     e.preventDefault();
     if (!sendMessageText.trim() || !selectedChat || !token || !socket) return;
 
-    try {
-      const response = await axios.post(
-        "http://127.0.0.1:5000/api/messages",
-        {
-          chat_id: selectedChat.chatId,
-          text: sendMessageText,
-        },
-        {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
+    // The server stores the message, broadcasts it to the chat room as
+    // "new_message" and acks with the stored message id.
+    socket.emit(
+      "send_message",
+      {
+        chat_id: selectedChat.chatId,
+        text: sendMessageText,
+      },
+      (ack: SendMessageAck) => {
+        if (ack?.error) {
+          console.error("Error sending message:", ack.error);
+          return;
         }
-      );
-      const newMessage = response.data as MessageResponse;
-      socket.emit("send_message", newMessage);
-      setSendMessageText("");
-    } catch (error) {
-      console.error("Error sending message:", error);
-    }
+        setSendMessageText("");
+      }
+    );
   };
 
   const handleCreateChatSubmit = async (e: React.FormEvent): Promise<void> => {
@@ -202,6 +360,11 @@ function Home() {
               onClick={() => handleChatClick(chat)}
             >
               {getParticipantsDisplay(chat.participants, user ?? "")}
+              {!!chat.unreadCount && (
+                <span className="ml-2 rounded-full bg-blue-600 px-2 text-sm">
+                  {chat.unreadCount}
+                </span>
+              )}
             </li>
           ))}
         </ol>
@@ -209,6 +372,13 @@ function Home() {
         {/* ----- Chat view ----- */}
         <div className="flex flex-col w-90 h-150 border border-white rounded-md">
           <ol className="flex flex-col gap-3 p-2 h-full overflow-auto">
+            {olderCursor && (
+              <li className="flex justify-center">
+                <button type="button" onClick={fetchOlderMessages}>
+                  Load older messages
+                </button>
+              </li>
+            )}
             {messages.map((message, i) => {
               return (
                 <li
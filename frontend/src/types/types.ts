@@ -8,6 +8,7 @@ export interface ChatResponse {
 	chatId: string;
 	participants: string[];
 	lastMessage?: LastMessageResponse;
+	unreadCount?: number;
 }
 
 export interface MessageResponse {
@@ -21,4 +22,24 @@ export interface MessageResponse {
 export interface ChatMessageResponse {
 	chatId: string;
 	messages: MessageResponse[];
+	nextCursor?: string; // pass as `before` to load older messages
+}
+
+export interface SendMessageAck {
+	messageId?: string;
+	timestamp?: string; // ISO string
+	error?: unknown;
+}
+
+export interface ReadStateResponse {
+	chatId: string;
+	messageId?: string; // null if the read position did not move
+	unreadCount: number;
+}
+
+export interface SyncResponse {
+	messages: MessageResponse[];
+	chats: ChatResponse[];
+	syncToken: string; // pass as `sync_token` when reconnecting
+	hasMore: boolean;
 }